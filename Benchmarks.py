@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import numpy as np
+
+FIXTURE_DIR = os.path.join(".cache", "bench_fixtures")
+
+# Workload sizes per scale. Fixtures are generated once per scale and reused.
+SCALES = {
+    "small": {"respondents": 10_000, "video_seconds": 10, "resolution": (320, 240), "samples": 10_000,
+              "snapshots": 5},
+    "medium": {"respondents": 100_000, "video_seconds": 30, "resolution": (640, 480), "samples": 100_000,
+               "snapshots": 10},
+    "large": {"respondents": 1_000_000, "video_seconds": 60, "resolution": (1280, 720), "samples": 1_000_000,
+              "snapshots": 50},
+}
+FPS = 30
+
+
+# --- SYNTHETIC FIXTURES ---
+
+def make_video(path, seconds, resolution, fps=FPS):
+    """Procedural test video: a drifting color gradient with a moving disc (plenty of motion for the codec)."""
+    if os.path.exists(path): return path
+    import cv2
+    width, height = resolution
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.mp4"
+    writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    xs, ys = np.meshgrid(np.arange(width), np.arange(height))
+    for i in range(int(seconds * fps)):
+        frame = np.empty((height, width, 3), np.uint8)
+        frame[..., 0] = (xs + 3 * i) % 256
+        frame[..., 1] = (ys + 2 * i) % 256
+        frame[..., 2] = (xs + ys + i) % 256
+        center = (int(width / 2 + width / 3 * np.sin(i / fps)), int(height / 2 + height / 3 * np.cos(i / fps)))
+        cv2.circle(frame, center, max(height // 8, 4), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    os.replace(tmp, path)
+    return path
+
+
+def make_signals(samples, seed=0):
+    """Random-walk valence/arousal in [-1, 1]."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.02, size=(2, samples))
+    return tuple(np.clip(np.cumsum(steps, axis=1), -1, 1))
+
+
+def make_responses(respondents, seed=0):
+    """Random 1-5 answers to the 44 items, with about 1% left unanswered."""
+    rng = np.random.default_rng(seed)
+    responses = rng.integers(1, 6, size=(respondents, 44)).astype(float)
+    responses[rng.random(responses.shape) < 0.01] = np.nan
+    return responses
+
+
+def fake_llm(latency, token_delay):
+    from OceanModel import StubChatModel
+    return StubChatModel(latency=latency, token_delay=token_delay)
+
+
+# --- MEASUREMENT ---
+
+def measure(fn, repeat=3):
+    """Runs `fn` `repeat` times; returns (median seconds, best seconds, last result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times), result
+
+
+def bench_scoring(cfg, repeat):
+    from OceanScoring import score_matrix
+    responses = make_responses(cfg["respondents"])
+    seconds, best, _ = measure(lambda: score_matrix(responses), repeat)
+    return {"seconds": seconds, "best": best, "rows_per_sec": len(responses) / best}
+
+
+def bench_frames(video, timestamps, repeat):
+    from VideoIndex import load_index
+    from VideoProcessing import get_frames
+    index = load_index(video)
+    seconds, best, frames = measure(lambda: get_frames(video, timestamps, index=index), repeat)
+    return {"seconds": seconds, "best": best, "frames": sum(f is not None for f in frames)}
+
+
+def bench_emotion_plots(valence, arousal, indices, repeat):
+    from EmotionPlot import render_emotion_plots
+    seconds, best, plots = measure(lambda: render_emotion_plots(valence, arousal, indices), repeat)
+    return {"seconds": seconds, "best": best, "bytes": sum(len(p) for p in plots)}
+
+
+def radar_chart_png(scores):
+    """The matplotlib radar chart the report used before the SVG one (base64 PNG), kept as a baseline."""
+    import base64
+    import io
+    import matplotlib.pyplot as plt
+    labels = list(scores.keys())
+    values = list(scores.values())
+    values += values[:1]
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    angles += angles[:1]
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    plt.xticks(angles[:-1], labels, color='#2c3e50', size=11, fontweight='bold')
+    ax.set_rlabel_position(30)
+    plt.yticks([20, 40, 60, 80, 100], ["20", "40", "60", "80", "100"], color="grey", size=9)
+    plt.ylim(0, 100)
+
+    ax.plot(angles, values, linewidth=2.5, linestyle='solid', color='#2c3e50')
+    ax.fill(angles, values, alpha=0.3, color='#3498db')
+    plt.title("Normalized Personality Profile", y=1.08, fontsize=14, fontweight='bold', color='#2c3e50')
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight', transparent=True)
+    plt.close()
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+def bench_radar(repeat):
+    from ReportGeneration import create_radar_chart_svg
+    scores = {"Openness": 72.5, "Conscientiousness": 41.0, "Extraversion": 55.3, "Agreeableness": 63.8,
+              "Neuroticism": 30.2}
+    results = {}
+    for name, fn in (("radar_svg", create_radar_chart_svg), ("radar_png", radar_chart_png)):
+        seconds, best, chart = measure(lambda: fn(scores), repeat)
+        results[name] = {"seconds": seconds, "best": best, "bytes": len(chart)}
+    return results
+
+
+def bench_report(video, valence, arousal, indices, timestamps, profile, llm, repeat, cold):
+    """
+    End-to-end report latency: LLM analysis and snapshot stages through the
+    pipeline, then the HTML render. `cold` empties the snapshot cache before
+    every run; otherwise snapshots come from the cache after the first run.
+    """
+    from Instrumentation import record_report
+    from OceanModel import llm_analysis_stream
+    from ReportGeneration import generate_html_report
+    from ReportPipeline import run_report_pipeline
+    from SnapshotCache import get_snapshot_cache
+    scores = {"O": 72.5, "C": 41.0, "E": 55.3, "A": 63.8, "N": 30.2}
+    analysis = lambda s: "".join(llm_analysis_stream(s, use_cache=False, llm=llm))
+
+    def run():
+        if cold: get_snapshot_cache().clear()
+        with record_report("benchmark") as metrics:
+            text, snapshots, _ = run_report_pipeline(scores, video, valence, arousal, indices, timestamps,
+                                                     analysis_fn=analysis, profile=profile)
+            html = generate_html_report("Benchmark", list(scores.values()), text, snapshots, profile=profile)
+        return html, metrics
+
+    if not cold: run()  # Warm the cache
+    seconds, best, (html, metrics) = measure(run, repeat)
+    stages = {name: round(total["wall"], 6) for name, total in metrics.summary().items()}
+    return {"seconds": seconds, "best": best, "bytes": len(html.encode("utf-8")), "stages": stages}
+
+
+def run_scale(scale, repeat=3, llm_latency=0.5, token_delay=0.0, profiles=("full", "standard", "compact")):
+    cfg = SCALES[scale]
+    width, height = cfg["resolution"]
+    video = make_video(os.path.join(FIXTURE_DIR, f"video_{cfg['video_seconds']}s_{width}x{height}.mp4"),
+                       cfg["video_seconds"], cfg["resolution"])
+    valence, arousal = make_signals(cfg["samples"])
+    indices = np.linspace(0, cfg["samples"] - 1, cfg["snapshots"] + 2, dtype=int)[1:-1].tolist()
+    timestamps = [i / cfg["samples"] * cfg["video_seconds"] for i in indices]
+    llm = fake_llm(llm_latency, token_delay)
+
+    results = {"scoring": bench_scoring(cfg, repeat),
+               "frames": bench_frames(video, timestamps, repeat),
+               "emotion_plots": bench_emotion_plots(valence, arousal, indices, repeat)}
+    results.update(bench_radar(repeat))
+    for profile in profiles:
+        for cold in (True, False):
+            name = f"report_{profile}_{'cold' if cold else 'warm'}"
+            results[name] = bench_report(video, valence, arousal, indices, timestamps, profile, llm, repeat, cold)
+    return {f"{scale}/{name}": result for name, result in results.items()}
+
+
+def environment():
+    import cv2
+    return {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+# --- BASELINE COMPARISON ---
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compares each benchmark's best time (the least noisy estimate) and output
+    bytes with the baseline. A metric regresses when it grew by more than
+    `threshold` (0.2 = 20%).
+
+    Returns:
+        list: (benchmark, metric, baseline value, current value, ratio, regressed) rows.
+    """
+    rows = []
+    for name, current in results["results"].items():
+        base = baseline["results"].get(name)
+        if not base: continue
+        for metric in ("best", "bytes"):
+            if metric not in current or not base.get(metric): continue
+            ratio = current[metric] / base[metric]
+            rows.append((name, metric, base[metric], current[metric], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_results(results):
+    for name, result in results["results"].items():
+        extra = "".join(f"  {key}={value:,.0f}" for key, value in result.items()
+                        if key in ("rows_per_sec", "bytes", "frames"))
+        print(f"{name:<36}{result['seconds'] * 1000:10.1f} ms{extra}")
+
+
+def print_comparison(rows, threshold):
+    for name, metric, base, current, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<36}{metric:<8}{base:14.4g}{current:14.4g}{ratio:8.2f}x  {flag}")
+    failed = sum(row[-1] for row in rows)
+    print(f"{failed} regression(s) over {threshold:.0%} across {len(rows)} compared metrics.")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the report path on synthetic fixtures.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["small"], help="Workload sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (the median is reported)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Fake LLM delay per streamed word")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results JSON")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown/growth before failing")
+    args = parser.parse_args()
+
+    # Snapshots are cached apart from the app's cache, which the cold runs empty.
+    os.environ["OCEAN_SNAPSHOT_CACHE"] = os.path.join(FIXTURE_DIR, "snapshots.sqlite")
+    results = {"environment": environment(), "config": {"repeat": args.repeat, "llm_latency": args.llm_latency,
+                                                        "token_delay": args.token_delay},
+               "results": {}}
+    for scale in args.scale:
+        results["results"].update(run_scale(scale, args.repeat, args.llm_latency, args.token_delay))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"Results written to {args.output}.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if print_comparison(compare(results, baseline, args.threshold), args.threshold):
+            sys.exit(1)
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from OceanScoring import COMPILED, OCEAN_ORDER, item_columns, iter_response_chunks, score_matrix
+
+SKIPPED_ANALYSIS = "_Written analysis was not generated for this batch._"
+
+
+def report_path(output_dir, candidate_id):
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(candidate_id))
+    return os.path.join(output_dir, f"{safe}.html")
+
+
+def render_report(job):
+    """
+    Worker: renders and writes one report. The file is written to a temporary
+    name and renamed, so a crash never leaves a half-written report behind
+    that a resumed run would mistake for a finished one.
+
+    Returns:
+        tuple: (seconds spent rendering, bytes written).
+    """
+    from ReportGeneration import write_html_report
+    path, name, scores_array, analysis = job
+    start = time.perf_counter()
+    tmp = path + ".tmp"
+    size = write_html_report(tmp, name, scores_array, analysis)
+    os.replace(tmp, path)
+    return time.perf_counter() - start, size
+
+
+def analyze(profiles, llm, concurrency):
+    """Runs the LLM step for a chunk ('none', 'stub' or 'gemini')."""
+    if llm == "none":
+        return [SKIPPED_ANALYSIS] * len(profiles)
+    from OceanModel import StubChatModel, llm_analysis_batch
+    model = StubChatModel() if llm == "stub" else None
+    results = asyncio.run(llm_analysis_batch(profiles, concurrency=concurrency, llm=model))
+    return [r['report'] if r['ok'] else f"Error generating report: {r['error']}" for r in results]
+
+
+def generate_reports(input_path, output_dir, workers=None, chunksize=10_000, id_column="id", name_column=None,
+                     llm="none", llm_concurrency=8):
+    """
+    Scores a response export and writes one HTML report per respondent.
+
+    Respondents whose report already exists in `output_dir` are skipped, so
+    an interrupted run can simply be restarted.
+
+    Returns:
+        dict: Counts and per-stage seconds for the throughput summary.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {'written': 0, 'skipped': 0, 'bytes': 0,
+             'seconds': {'read': 0.0, 'scoring': 0.0, 'llm': 0.0, 'render (worker total)': 0.0}}
+    start, offset = time.perf_counter(), 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = iter_response_chunks(input_path, chunksize)
+        while True:
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            stats['seconds']['read'] += time.perf_counter() - t0
+            if chunk is None: break
+
+            ids = chunk[id_column].tolist() if id_column in chunk else list(range(offset, offset + len(chunk)))
+            offset += len(chunk)
+            names = chunk[name_column].tolist() if name_column else [str(i) for i in ids]
+            paths = [report_path(output_dir, i) for i in ids]
+            todo = [k for k, p in enumerate(paths) if not os.path.exists(p)]
+            stats['skipped'] += len(paths) - len(todo)
+            if not todo: continue
+
+            t0 = time.perf_counter()
+            cols = item_columns(chunk.columns)
+            scores = score_matrix(chunk[cols].to_numpy(dtype=float, na_value=float('nan'))[todo])
+            order = [COMPILED['traits'].index(t) for t in OCEAN_ORDER]
+            scores = scores[:, order].tolist()
+            stats['seconds']['scoring'] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            analyses = analyze([dict(zip(OCEAN_ORDER, s)) for s in scores], llm, llm_concurrency)
+            stats['seconds']['llm'] += time.perf_counter() - t0
+
+            jobs = [(paths[k], names[k], s, a) for k, s, a in zip(todo, scores, analyses)]
+            for seconds, size in pool.map(render_report, jobs, chunksize=64):
+                stats['seconds']['render (worker total)'] += seconds
+                stats['bytes'] += size
+                stats['written'] += 1
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+def print_summary(stats):
+    elapsed = max(stats['elapsed'], 1e-9)
+    print(f"Wrote {stats['written']} reports ({stats['bytes'] / 1e6:.1f} MB), skipped {stats['skipped']} "
+          f"already finished, in {elapsed:.2f}s: {stats['written'] / elapsed:.1f} reports/sec.")
+    for stage, seconds in stats['seconds'].items():
+        print(f"  {stage:<24}{seconds:9.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate HTML reports for a CSV/Parquet export of responses.")
+    parser.add_argument("input", help="Responses with item columns 1..44 or q1..q44")
+    parser.add_argument("output_dir", help="Directory receiving one <id>.html per respondent")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=10_000, help="Respondents read and scored per chunk")
+    parser.add_argument("--id-column", default="id", help="Column naming the report file (default: row number)")
+    parser.add_argument("--name-column", help="Column with the candidate name shown in the report")
+    parser.add_argument("--llm", choices=["none", "stub", "gemini"], default="none",
+                        help="Written analysis: skip it, use the offline stub model, or call Gemini")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Concurrent Gemini requests")
+    args = parser.parse_args()
+    print_summary(generate_reports(args.input, args.output_dir, args.workers, args.chunksize, args.id_column,
+                                   args.name_column, args.llm, args.llm_concurrency))
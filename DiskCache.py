@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def make_key(*parts):
+    """Content-addressed cache key for any tuple of plain values."""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded LRU byte store backed by SQLite.
+
+    SQLite's WAL mode and file locking make one cache file safe to share
+    between Streamlit sessions (threads) and worker processes. Every thread
+    and process gets its own connection. Hit/miss counters are kept both
+    per-process (`local_stats`) and in the database (`stats()`), so the latter
+    covers every user of the file.
+
+    A hit only reads: access times and counters are buffered and written in
+    one transaction every `FLUSH_EVERY` lookups or `FLUSH_SECONDS`, or with
+    the next `set`, so readers never wait for the write lock. The total
+    payload size is kept as a counter instead of summed on every `set`.
+
+    Args:
+        path (str): SQLite file, created on first use.
+        max_bytes (int): Total payload size kept before least recently used
+            entries are evicted.
+        ttl (float): Optional lifetime of an entry in seconds.
+    """
+
+    FLUSH_EVERY = 256
+    FLUSH_SECONDS = 5.0
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.local_stats = {'hits': 0, 'misses': 0}
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending_access, self._pending_counts = {}, {'hits': 0, 'misses': 0}
+        self._flushed = time.time()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with self._conn() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                       "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+            # Running payload size; computed once for files written before it was kept.
+            db.execute("INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+
+    def _conn(self):
+        # Connections must not cross threads or survive a fork.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _record(self, name, key=None, now=None):
+        """Buffers a hit (with its access time) or miss; True when a flush is due."""
+        with self._pending_lock:
+            self.local_stats[name] += 1
+            self._pending_counts[name] += 1
+            if key is not None: self._pending_access[key] = now
+            pending = sum(self._pending_counts.values())
+            return pending >= self.FLUSH_EVERY or time.time() - self._flushed >= self.FLUSH_SECONDS
+
+    def _flush(self, db):
+        """Writes buffered access times and counters within the caller's transaction."""
+        with self._pending_lock:
+            accesses, counts = self._pending_access, self._pending_counts
+            self._pending_access, self._pending_counts = {}, {'hits': 0, 'misses': 0}
+            self._flushed = time.time()
+        db.executemany("UPDATE entries SET accessed = MAX(accessed, ?) WHERE key = ?",
+                       [(t, key) for key, t in accesses.items()])
+        db.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                       [(v, name) for name, v in counts.items() if v])
+
+    def flush(self):
+        """Writes buffered access times and hit/miss counts now."""
+        with self._conn() as db:
+            self._flush(db)
+
+    def get(self, key):
+        """Returns the stored bytes for `key`, or None on a miss."""
+        entry = self.get_entry(key)
+        return entry and entry[0]
+
+    def get_entry(self, key):
+        """Returns (stored bytes, creation time) for `key`, or None on a miss."""
+        now = time.time()
+        row = self._conn().execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        # Expired entries count as misses; the next set() for the key replaces them.
+        if row and self.ttl is not None and now - row[1] > self.ttl:
+            row = None
+        if self._record('misses' if row is None else 'hits', row and key, now):
+            self.flush()
+        return None if row is None else (bytes(row[0]), row[1])
+
+    def set(self, key, value):
+        """Stores `value` (bytes) and evicts LRU entries beyond `max_bytes`."""
+        if len(value) > self.max_bytes: return
+        now = time.time()
+        with self._conn() as db:
+            self._flush(db)
+            old = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (key, sqlite3.Binary(value), len(value), now, now))
+            total = self._add_bytes(db, len(value) - (old[0] if old else 0))
+            if total > self.max_bytes:
+                self._add_bytes(db, -self._evict(db, total - self.max_bytes))
+
+    @staticmethod
+    def _add_bytes(db, delta):
+        db.execute("UPDATE counters SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return db.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, db, excess):
+        """Deletes least recently used entries until `excess` bytes are freed; returns bytes freed."""
+        freed, doomed = 0, []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if freed >= excess: break
+            doomed.append((key,))
+            freed += size
+        db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        return freed
+
+    def stats(self):
+        """Hit/miss counters across all users of the file, plus current size."""
+        with self._conn() as db:
+            self._flush(db)
+            counters = dict(db.execute("SELECT name, value FROM counters"))
+            entries = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {**counters, 'hit_rate': counters['hits'] / lookups if lookups else 0.0, 'entries': entries}
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending_access, self._pending_counts = {}, {'hits': 0, 'misses': 0}
+        with self._conn() as db:
+            db.execute("DELETE FROM entries")
+            db.execute("UPDATE counters SET value = 0")
@@ -0,0 +1,235 @@
+import numpy as np
+
+# Same quadrants (and order) as the labels on the emotion plot.
+QUADRANTS = ["Excited", "Stressed", "Depressed", "Relaxed"]
+# Samples handled per step of the streaming pass (bounds temporary memory).
+CHUNK = 1 << 20
+
+
+def _chunk_size(step):
+    """Largest multiple of `step` not above CHUNK, so chunks split on block edges."""
+    return step * max(CHUNK // step, 1)
+
+
+def _block_sums(part, step):
+    """Float64 sums and sums of squares of `part` over blocks of `step` samples."""
+    part = np.asarray(part, dtype=np.float64)
+    if step == 1: return part, part * part
+    offsets = np.arange(0, len(part), step)
+    return np.add.reduceat(part, offsets), np.add.reduceat(part * part, offsets)
+
+
+def block_stats(x, step, n=None):
+    """
+    Sums and sums of squares of the first `n` samples of `x` (all by
+    default) over consecutive blocks of `step` samples (the last block may
+    be shorter). `x` is only ever sliced one chunk at a time, so neither a
+    chunked store nor a full-length float64 copy is materialized.
+
+    Returns:
+        tuple: (sums, sums of squares, sample counts) per block.
+    """
+    n = len(x) if n is None else n
+    starts = np.arange(0, n, step)
+    sums, squares = np.empty(len(starts)), np.empty(len(starts))
+    chunk = _chunk_size(step)
+    for lo in range(0, n, chunk):
+        k = lo // step
+        s1, s2 = _block_sums(x[lo:min(lo + chunk, n)], step)
+        sums[k:k + len(s1)], squares[k:k + len(s1)] = s1, s2
+    return sums, squares, np.minimum(starts + step, n) - starts
+
+
+def _trailing_sums(values, blocks):
+    """Sums over the last `blocks` entries at every position (fewer at the start)."""
+    c = np.concatenate(([0.0], np.cumsum(values)))
+    hi = np.arange(1, len(values) + 1)
+    return c[hi] - c[np.maximum(hi - blocks, 0)]
+
+
+def _rolling(sums, squares, counts, blocks):
+    count = _trailing_sums(counts, blocks)
+    mean = _trailing_sums(sums, blocks) / count
+    var = np.maximum(_trailing_sums(squares, blocks) / count - mean * mean, 0.0)
+    return mean, var
+
+
+def rolling_mean_var(x, window, step=1):
+    """
+    Trailing rolling mean and variance from cumulative sums, O(n) for any
+    window. With `step` > 1 they are evaluated at the end of every block of
+    `step` samples, over the last `window // step` blocks. The first
+    windows use the samples seen so far.
+    """
+    return _rolling(*block_stats(x, step), max(window // step, 1))
+
+
+def quadrant_codes(valence, arousal):
+    """0 Excited (+V +A), 1 Stressed (-V +A), 2 Depressed (-V -A), 3 Relaxed (+V -A)."""
+    v_neg = np.asarray(valence) < 0
+    a_neg = np.asarray(arousal) < 0
+    return (a_neg.view(np.int8) << 1) | (v_neg ^ a_neg).view(np.int8)
+
+
+def _change_scores(sums, counts, blocks):
+    """Change scores at block boundaries from per-block sums of each signal."""
+    score = np.zeros(len(counts))
+    if len(counts) < 2 * blocks: return score
+    c_n = np.concatenate(([0], np.cumsum(counts)))
+    mid = np.arange(blocks, len(counts) - blocks + 1)
+    n_before, n_after = c_n[mid] - c_n[mid - blocks], c_n[mid + blocks] - c_n[mid]
+    for s in sums:
+        c = np.concatenate(([0.0], np.cumsum(s)))
+        score[mid] += ((c[mid + blocks] - c[mid]) / n_after - (c[mid] - c[mid - blocks]) / n_before) ** 2
+    return np.sqrt(score)
+
+
+def change_scores(valence, arousal, window, step=1):
+    """
+    Change-point strength: distance between the mean (valence, arousal) of
+    the `window` samples before and the `window` samples after a sample.
+
+    Evaluated at every `step`-th sample (entry j is sample j * step, with
+    the window rounded to whole blocks); 0 where a window would run past
+    either end.
+    """
+    n = min(len(valence), len(arousal))
+    stats = [block_stats(signal, step, n) for signal in (valence, arousal)]
+    return _change_scores([s[0] for s in stats], stats[0][2], max(window // step, 1))
+
+
+def local_peaks(x, threshold):
+    """Indices of strict local maxima of `x` above `threshold`."""
+    x = np.asarray(x)
+    if len(x) < 3: return np.empty(0, dtype=np.int64)
+    idx = np.flatnonzero(x[1:-1] > threshold) + 1
+    return idx[(x[idx] > x[idx - 1]) & (x[idx] >= x[idx + 1])]
+
+
+def _chunked_peaks(x, threshold, n):
+    """Number of `local_peaks` of the first `n` samples of `x`, scanned a chunk at a time."""
+    found, chunk = 0, CHUNK
+    for lo in range(0, n, chunk):
+        # One sample of overlap on each side, so peaks at chunk edges are seen once.
+        start = max(lo - 1, 0)
+        peaks = local_peaks(x[start:min(lo + chunk + 1, n)], threshold) + start
+        found += int(np.count_nonzero((peaks >= lo) & (peaks < lo + chunk)))
+    return found
+
+
+def _refine(valence, arousal, idx, window, step, n):
+    """Full-resolution change-score maximum within one block of sample `idx`."""
+    lo, hi = max(idx - step - window, 0), min(idx + step + window, n)
+    local = change_scores(valence[lo:hi], arousal[lo:hi], window)
+    return lo + int(np.argmax(local)) if local.size and local.max() > 0 else idx
+
+
+def salient_indices(valence, arousal, count=10, window=None, min_gap=None):
+    """
+    Picks the `count` most salient moments of a recording: the strongest
+    emotion changes, spaced at least `min_gap` samples apart. Falls back to
+    evenly spaced samples when the signal has too few distinct changes.
+
+    Change scores are computed on blocks of `window // 8` samples, so each
+    change is one bump of a short score array. Its peaks (one per bump) are
+    ranked and spaced out, and only the chosen ones are located to the
+    sample at full resolution.
+    """
+    n = min(len(valence), len(arousal))
+    if n <= count: return list(range(n))
+    window = window or max(n // (count * 20), 1)
+    min_gap = min_gap or max(n // (count * 3), 1)
+    step = max(window // 8, 1)
+    score = change_scores(valence, arousal, window, step)
+
+    peaks = local_peaks(score, 0)
+    peaks = peaks[np.argsort(score[peaks], kind='stable')[::-1]]
+    chosen = []
+    for j in peaks:
+        if len(chosen) == count: break
+        idx = int(j) * step
+        if all(abs(idx - c) >= min_gap for c in chosen):
+            chosen.append(idx)
+    if step > 1:
+        chosen = [_refine(valence, arousal, idx, window, step, n) for idx in chosen]
+    for idx in np.linspace(0, n - 1, count + 2, dtype=np.int64)[1:-1]:
+        if len(chosen) == count: break
+        if all(abs(int(idx) - c) >= min_gap // 2 for c in chosen):
+            chosen.append(int(idx))
+    return sorted(chosen)
+
+
+def summarize_emotions(valence, arousal, sample_rate, window=None):
+    """
+    Aggregate analytics over a whole recording.
+
+    One streaming pass over both signals counts quadrant dwell and
+    transitions and collects block sums, from which the means, rolling
+    statistics and change points are derived; arousal peaks take one more
+    threshold scan. Rolling statistics and change scores have a resolution
+    of `window // 8` samples.
+
+    Args:
+        valence, arousal: Signals (arrays, memory-mapped views or chunked
+            stores); only one chunk of each is in memory at a time.
+        sample_rate (float): Samples per second, to express dwell in seconds.
+        window (int): Rolling/change window in samples (default: ~1% of n).
+
+    Returns:
+        dict: Means and spreads, rolling mean ranges and maximum rolling
+        spreads, per-quadrant dwell time and share, quadrant transition
+        count and matrix, arousal peaks and change points.
+    """
+    n = min(len(valence), len(arousal))
+    window = window or max(n // 100, 2)
+    step = max(window // 8, 1)
+
+    counts, pairs, prev = np.zeros(4, np.int64), np.zeros(16, np.int64), None
+    sums = {name: ([], []) for name in ("valence", "arousal")}
+    chunk = _chunk_size(step)
+    for lo in range(0, n, chunk):
+        hi = min(lo + chunk, n)
+        v_part, a_part = np.asarray(valence[lo:hi]), np.asarray(arousal[lo:hi])
+        codes = quadrant_codes(v_part, a_part)
+        counts += np.bincount(codes, minlength=4)
+        if prev is not None: codes = np.concatenate(([prev], codes))
+        switches = np.flatnonzero(codes[1:] != codes[:-1])
+        pairs += np.bincount(codes[switches].astype(np.int64) * 4 + codes[switches + 1], minlength=16)
+        prev = codes[-1]
+        for name, part in (("valence", v_part), ("arousal", a_part)):
+            for total, block in zip(sums[name], _block_sums(part, step)):
+                total.append(block)
+    pairs = pairs.reshape(4, 4)
+
+    starts = np.arange(0, n, step)
+    block_counts = np.minimum(starts + step, n) - starts
+    blocks = max(window // step, 1)
+    stats, block_sums = {}, []
+    for name, (s1, s2) in sums.items():
+        s1, s2 = (np.concatenate(s) if s else np.empty(0) for s in (s1, s2))
+        block_sums.append(s1)
+        mean = s1.sum() / max(n, 1)
+        rolling_mean, rolling_var = _rolling(s1, s2, block_counts, blocks)
+        stats[name] = (float(mean), float(np.sqrt(max(s2.sum() / max(n, 1) - mean * mean, 0.0))),
+                       [float(rolling_mean.min()), float(rolling_mean.max())] if n else [0.0, 0.0],
+                       float(np.sqrt(rolling_var.max())) if n else 0.0)
+    (v_mean, v_std, v_range, v_spread), (a_mean, a_std, a_range, a_spread) = stats['valence'], stats['arousal']
+
+    peaks = _chunked_peaks(arousal, a_mean + 2 * a_std, n)
+    changes = _change_scores(block_sums, block_counts, blocks)
+    change_points = local_peaks(changes, changes.mean() + 3 * changes.std()) if n else changes
+
+    return {
+        'samples': n,
+        'duration': n / sample_rate,
+        'valence_mean': v_mean, 'valence_std': v_std,
+        'arousal_mean': a_mean, 'arousal_std': a_std,
+        'rolling_valence_mean_range': v_range, 'rolling_arousal_mean_range': a_range,
+        'max_rolling_valence_std': v_spread, 'max_rolling_arousal_std': a_spread,
+        'dwell_seconds': {q: float(c / sample_rate) for q, c in zip(QUADRANTS, counts)},
+        'dwell_share': {q: float(c / max(n, 1)) for q, c in zip(QUADRANTS, counts)},
+        'transitions': int(pairs.sum()),
+        'transition_matrix': pairs.tolist(),
+        'arousal_peaks': peaks,
+        'change_points': int(len(change_points)),
+    }
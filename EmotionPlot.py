@@ -0,0 +1,118 @@
+import base64
+import cv2
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from Instrumentation import instrument
+
+# Dark theme colors, set on the figure itself: style contexts change the
+# process-wide rcParams, and plots are rendered from several threads at once.
+FOREGROUND = 'white'
+
+QUADRANT_LABELS = [("Excited", 0.7, 0.7, "#7ee787"), ("Stressed", -0.7, 0.7, "#ff7b72"),
+                   ("Depressed", -0.7, -0.7, "#a5d6ff"), ("Relaxed", 0.7, -0.7, "#d2a8ff")]
+
+
+def lttb_downsample(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a point sequence.
+
+    The samples are split into `n_out - 2` buckets in order; from each bucket
+    the point forming the largest triangle with the previously kept point and
+    the mean of the next bucket is kept. Areas are measured in the (x, y)
+    plane, so for the valence/arousal trajectory the drawn shape is preserved
+    rather than either signal on its own. First and last points are kept.
+
+    Returns:
+        tuple: Downsampled (x, y) arrays.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3: return x, y
+
+    # Bucket i spans [edges[i], edges[i + 1]); the last point is its own bucket.
+    edges = np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+class EmotionPlotRenderer:
+    """
+    Renders the valence/arousal mapping for many snapshots of one recording.
+
+    The axes, quadrant labels and (downsampled) trajectory are drawn once and
+    the rendered pixels are kept as a background. Each snapshot restores that
+    background and draws only the red marker on top, so rendering costs the
+    same no matter how long the signals are.
+
+    Args:
+        valence_data (np.ndarray): Valence signal.
+        arousal_data (np.ndarray): Arousal signal.
+        max_points (int): Trajectory points drawn after LTTB downsampling.
+        trajectory (tuple): Precomputed (valence, arousal) overview to draw
+            instead of downsampling the signals here (see
+            EmotionSignalStore.overview).
+    """
+
+    @instrument("emotion_plot_background")
+    def __init__(self, valence_data, arousal_data, max_points=2000, trajectory=None):
+        self.valence_data, self.arousal_data = valence_data, arousal_data
+        fig = Figure(figsize=(4, 4))
+        self.canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        # Transparent like the previous savefig(transparent=True) output.
+        fig.patch.set_alpha(0)
+        ax.patch.set_alpha(0)
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-1.1, 1.1)
+        ax.tick_params(colors=FOREGROUND)
+        for spine in ax.spines.values():
+            spine.set_edgecolor(FOREGROUND)
+        ax.grid(True, linestyle='--', alpha=0.1, color='#8b949e')
+        ax.axhline(0, color='#30363d', linewidth=1.5)
+        ax.axvline(0, color='#30363d', linewidth=1.5)
+        if trajectory is None:
+            n = min(len(valence_data), len(arousal_data))
+            trajectory = lttb_downsample(valence_data[:n], arousal_data[:n], max_points)
+        v, a = trajectory
+        ax.plot(v, a, color='#58a6ff', alpha=0.15, linewidth=1)
+        for text, x, y, col in QUADRANT_LABELS:
+            ax.text(x, y, text, fontsize=9, color=col, alpha=0.7, ha='center', weight='bold')
+        self.marker = ax.scatter([0], [0], color='#ff7b72', s=120, zorder=5, edgecolors='white',
+                                 animated=True)
+        fig.tight_layout()
+        self.fig, self.ax = fig, ax
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(fig.bbox)
+
+    @instrument("emotion_plot", size=len)
+    def render(self, current_idx):
+        """Returns PNG bytes of the plot with the marker at `current_idx`."""
+        self.canvas.restore_region(self._background)
+        self.marker.set_offsets([[self.valence_data[current_idx], self.arousal_data[current_idx]]])
+        self.ax.draw_artist(self.marker)
+        rgba = np.asarray(self.canvas.buffer_rgba())
+        _, buffer = cv2.imencode('.png', cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA))
+        return buffer.tobytes()
+
+    def render_base64(self, current_idx):
+        """Base64 PNG for the 'plot' field of a report snapshot."""
+        return base64.b64encode(self.render(current_idx)).decode('utf-8')
+
+
+def render_emotion_plots(valence_data, arousal_data, indices, trajectory=None):
+    """PNG plots for several snapshots of one recording."""
+    renderer = EmotionPlotRenderer(valence_data, arousal_data, trajectory=trajectory)
+    return [renderer.render(idx) for idx in indices]
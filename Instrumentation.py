@@ -0,0 +1,200 @@
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Optional exports: every finished report appends its stages to METRICS_LOG
+# as JSON lines, and is profiled with cProfile into PROFILE_DIR.
+METRICS_LOG = os.getenv("OCEAN_METRICS_LOG")
+PROFILE_DIR = os.getenv("OCEAN_PROFILE_DIR")
+
+FIELDS = ("wall", "cpu", "bytes", "cache_hits", "cache_misses", "input_tokens", "output_tokens")
+
+_current = contextvars.ContextVar("ocean_report_metrics", default=None)
+_totals, _totals_lock = {}, threading.Lock()
+
+
+def _new_record(name):
+    return dict({'stage': name, 'calls': 1}, **{field: 0 for field in FIELDS})
+
+
+def _aggregate(records, into=None):
+    """Sums records per stage name, keeping first-seen order."""
+    summary = {} if into is None else into
+    for rec in records:
+        total = summary.setdefault(rec['stage'], dict(_new_record(rec['stage']), calls=0))
+        for field in FIELDS + ('calls',):
+            total[field] += rec[field]
+    return summary
+
+
+class ReportMetrics:
+    """
+    Per-stage measurements of one report: wall and CPU seconds, bytes
+    produced, cache hits/misses and LLM token counts.
+
+    Instrumented code records into the metrics of the report being generated
+    (see `record_report`); stages may finish on any thread. CPU time is that
+    of the thread running the stage. Stages nest, and each one counts its
+    nested stages too (e.g. the template render includes encoding the
+    snapshot images it reaches).
+    """
+
+    def __init__(self, name="report"):
+        self.name, self.started = name, time.time()
+        self.records, self.wall = [], None
+        self._lock = threading.Lock()
+
+    def add(self, rec):
+        with self._lock:
+            self.records.append(rec)
+
+    def summary(self):
+        """{stage: totals} over all calls of each stage."""
+        with self._lock:
+            return _aggregate(self.records)
+
+    def to_jsonl(self):
+        """One JSON line per recorded stage call."""
+        return "".join(json.dumps(dict(rec, report=self.name, started=self.started)) + "\n"
+                       for rec in self.records)
+
+    def to_prometheus(self):
+        return format_prometheus(self.summary())
+
+
+@contextmanager
+def record_report(name="report", profile_path=None):
+    """
+    Collects the stage metrics of everything run inside the block, including
+    work handed to ReportPipeline threads. With `profile_path` (or
+    OCEAN_PROFILE_DIR set) the calling thread is also profiled with cProfile
+    and the stats dumped there.
+    """
+    metrics = ReportMetrics(name)
+    token = _current.set(metrics)
+    if profile_path is None and PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_path = os.path.join(PROFILE_DIR, f"report-{int(metrics.started * 1000)}.prof")
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler: profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        _current.reset(token)
+        metrics.wall = time.time() - metrics.started
+        with _totals_lock:
+            _aggregate(metrics.records, _totals)
+        if METRICS_LOG:
+            with open(METRICS_LOG, 'a', encoding='utf-8') as f:
+                f.write(metrics.to_jsonl())
+
+
+def current_metrics():
+    """Metrics of the report being generated in this context, or None."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Times the block as stage `name`. Yields the record so the block can add
+    'bytes', 'cache_hits', tokens, etc. Nothing is kept outside `record_report`.
+    """
+    metrics = _current.get()
+    rec = _new_record(name)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield rec
+    finally:
+        rec['wall'] += time.perf_counter() - wall
+        rec['cpu'] += time.thread_time() - cpu
+        if metrics is not None: metrics.add(rec)
+
+
+def instrument(name, size=None):
+    """Decorator recording each call as stage `name`; `size(result)` gives the bytes produced."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None: return fn(*args, **kwargs)
+            with stage(name) as rec:
+                result = fn(*args, **kwargs)
+                if size: rec['bytes'] += size(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def timed_iter(name, iterable, size=len, counters=None):
+    """
+    Records the consumption of a generator as one stage. Only the time spent
+    producing items counts, not the consumer's work between them. `counters`
+    is a dict the generator may fill (cache hits, tokens) while it runs; it
+    is added to the record at the end.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield from iterable
+        return
+    rec, it = _new_record(name), iter(iterable)
+    try:
+        while True:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                rec['wall'] += time.perf_counter() - wall
+                rec['cpu'] += time.thread_time() - cpu
+            rec['bytes'] += size(item)
+            yield item
+    finally:
+        for field, value in (counters or {}).items():
+            rec[field] += value
+        metrics.add(rec)
+
+
+def nbytes(value):
+    """Size of a frame, encoded image or base64 string (0 for None)."""
+    if value is None: return 0
+    if hasattr(value, 'nbytes'): return int(value.nbytes)
+    return len(value)
+
+
+def process_summary():
+    """Stage totals over every report recorded by this process."""
+    with _totals_lock:
+        return {stage_name: dict(total) for stage_name, total in _totals.items()}
+
+
+def format_prometheus(summary, prefix="ocean_report_stage"):
+    """Prometheus text exposition of a stage summary (counters labelled by stage)."""
+    metrics = [("calls_total", "calls", "Stage calls."),
+               ("wall_seconds_total", "wall", "Wall-clock seconds spent in the stage."),
+               ("cpu_seconds_total", "cpu", "CPU seconds spent in the stage."),
+               ("bytes_total", "bytes", "Bytes produced by the stage."),
+               ("cache_hits_total", "cache_hits", "Cache hits."),
+               ("cache_misses_total", "cache_misses", "Cache misses."),
+               ("input_tokens_total", "input_tokens", "LLM prompt tokens."),
+               ("output_tokens_total", "output_tokens", "LLM completion tokens.")]
+    lines = []
+    for suffix, field, help_text in metrics:
+        lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+        lines.append(f"# TYPE {prefix}_{suffix} counter")
+        for stage_name, total in summary.items():
+            lines.append(f'{prefix}_{suffix}{{stage="{stage_name}"}} {total[field]:g}')
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_text():
+    """Process-wide totals in Prometheus text format, for a /metrics endpoint."""
+    return format_prometheus(process_summary())
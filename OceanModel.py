@@ -1,33 +1,35 @@
+import asyncio
+import functools
+import hashlib
 import os
+import random
+import threading
+import time
+from collections import OrderedDict
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from DiskCache import DiskCache, make_key
+from Instrumentation import stage, timed_iter
 
 load_dotenv()
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
-# Function to generate the report
-def llm_analysis(scores):
-    """
-    Generates a personality report using Google Gemini 1.5 Flash.
-
-    Args:
-        scores (dict): Dictionary of OCEAN scores (e.g., {'Openness': 35, ...})
-        api_key (str): Google API Key
-
-    Returns:
-        str: Markdown formatted report.
-    """
+MODEL_NAME = "gemini-2.5-flash"
 
-    # 1. Initialize Gemini Model (Using 1.5 Flash for speed)
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.7
-    )
+# Report cache settings: scores are rounded to SCORE_BUCKET points before
+# lookup, so near-identical profiles share one generated report.
+CACHE_PATH = os.getenv("OCEAN_LLM_CACHE", os.path.join(".cache", "llm_reports.sqlite"))
+CACHE_TTL = float(os.getenv("OCEAN_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("OCEAN_LLM_CACHE_MB", "64")) * 1024 * 1024
+SCORE_BUCKET = float(os.getenv("OCEAN_SCORE_BUCKET", "1.0"))
 
-    # 2. Define the Prompt Template
-    template = """
+PROMPT_TEMPLATE = """
         You are an objective psychometrician and career counselor. 
         You are analyzing Big Five (OCEAN) personality scores to create a profile.
 
@@ -49,22 +51,325 @@ def llm_analysis(scores):
         - **Work & Career Style:** 2-3 sentences explaining how they naturally operate in a professional environment and team setting.
         - **Actionable Growth Advice:** 2-3 practical, realistic steps they can take immediately to mitigate their biggest blind spot.
         """
+TEMPLATE_HASH = hashlib.sha256(PROMPT_TEMPLATE.encode('utf-8')).hexdigest()
 
+
+def build_chain(llm):
+    """Builds the prompt | model | parser chain around any LangChain chat model."""
     prompt = PromptTemplate(
         input_variables=["scores_context"],
-        template=template
+        template=PROMPT_TEMPLATE
+    )
+    return prompt | llm | StrOutputParser()
+
+
+@functools.lru_cache(maxsize=None)
+def get_chain(model=MODEL_NAME):
+    """Builds the Gemini chain once per process and model."""
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=0.7
     )
+    return build_chain(llm)
+
+
+def format_scores(scores):
+    """Renders a score dict as the prompt's `scores_context` block."""
+    return "\n".join([f"- {trait}: {score}" for trait, score in scores.items()])
+
+
+STUB_REPORT = """- **Executive Summary:** Offline stub report. No model was called.
+- **Key Strengths:** Placeholder.
+- **Genuine Blind Spots:** Placeholder.
+- **Work & Career Style:** Placeholder.
+- **Actionable Growth Advice:** Placeholder."""
+
+
+class StubChatModel(SimpleChatModel):
+    """
+    Local stand-in for Gemini used for offline benchmarks and tests.
+
+    Replies with `response` after `latency` seconds (asyncio-friendly on the
+    async path) and fails with a ConnectionError on a `failure_rate` fraction
+    of calls, so retry handling can be exercised without a network. When
+    streamed, the reply arrives word by word, `token_delay` seconds apart.
+    """
+
+    response: str = STUB_REPORT
+    latency: float = 0.0
+    token_delay: float = 0.0
+    failure_rate: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "ocean-stub"
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Simulated transient model failure")
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return self.response
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [w if i == len(words) - 1 else w + " " for i, w in enumerate(words)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        for token in self._tokens():
+            time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        for token in self._tokens():
+            await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class ReportCache:
+    """
+    Two-tier cache of generated reports: an in-memory LRU in front of a shared
+    SQLite store. Entries expire after `ttl` seconds in both tiers.
+
+    Keys combine the prompt template hash, the model name and the score vector
+    quantized to `bucket` points, so editing the prompt or switching models
+    never serves stale reports.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, memory_entries=256,
+                 bucket=SCORE_BUCKET):
+        self.ttl, self.bucket, self.memory_entries = ttl, bucket, memory_entries
+        # Shared by every session and pipeline thread.
+        self._memory, self._lock = OrderedDict(), threading.Lock()
+        self._disk = DiskCache(path, max_bytes, ttl)
+
+    def key(self, scores, model=MODEL_NAME):
+        quantized = tuple((trait, round(float(scores[trait]) / self.bucket) * self.bucket)
+                          for trait in sorted(scores))
+        return make_key("llm_report", TEMPLATE_HASH, model, quantized)
+
+    def get(self, key):
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit and time.time() - hit[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                return hit[1]
+        entry = self._disk.get_entry(key)
+        if entry is None: return None
+        report = entry[0].decode('utf-8')
+        # Keep the disk entry's age, so promotion does not extend its lifetime.
+        self._remember(key, report, entry[1])
+        return report
+
+    def set(self, key, report):
+        self._remember(key, report, time.time())
+        self._disk.set(key, report.encode('utf-8'))
+
+    def _remember(self, key, report, created):
+        with self._lock:
+            self._memory[key] = (created, report)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=None)
+def get_report_cache():
+    return ReportCache()
+
 
-    # 3. Create the Chain
-    chain = prompt | llm | StrOutputParser()
+class UsageCounter(BaseCallbackHandler):
+    """Adds the token usage reported by the model to `counters` (a metrics record)."""
 
-    # 4. Format scores for the prompt
-    scores_text = "\n".join([f"- {trait}: {score}" for trait, score in scores.items()])
+    def __init__(self, counters):
+        self.counters = counters
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                for field in ('input_tokens', 'output_tokens'):
+                    self.counters[field] = self.counters.get(field, 0) + usage.get(field, 0)
+
+
+# Function to generate the report
+def llm_analysis(scores, use_cache=True):
+    """
+    Generates a personality report using Google Gemini 2.5 Flash.
+
+    Args:
+        scores (dict): Dictionary of OCEAN scores (e.g., {'Openness': 35, ...})
+        use_cache (bool): Serve and store the report through the report cache.
+            Pass False to force a fresh generation.
+
+    Returns:
+        str: Markdown formatted report.
+    """
+
+    # 1. Format scores for the prompt
+    scores_text = format_scores(scores)
     print(scores_text)
-    # 5. Run the Chain
-    try:
-        response = chain.invoke({"scores_context": scores_text})
-        print(response)
+
+    with stage("llm_analysis") as rec:
+        # 2. Serve repeat profiles from the cache
+        cache = get_report_cache() if use_cache else None
+        key = cache.key(scores) if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                rec['cache_hits'] += 1
+                return cached
+            rec['cache_misses'] += 1
+
+        # 3. Run the process-wide chain
+        try:
+            response = get_chain().invoke({"scores_context": scores_text},
+                                          config={"callbacks": [UsageCounter(rec)]})
+            print(response)
+        except Exception as e:
+            return f"Error generating report: {str(e)}"
+        rec['bytes'] += len(response)
+        if cache:
+            cache.set(key, response)
         return response
+
+
+
+def llm_analysis_stream(scores, use_cache=True, llm=None):
+    """
+    Streaming variant of `llm_analysis`: yields the Markdown report in chunks
+    as the model produces them.
+
+    A cached report is yielded as a single chunk. The complete report is
+    stored in the cache once the stream finishes; a failure mid-stream yields
+    the same error text `llm_analysis` returns and caches nothing.
+
+    Args:
+        scores (dict): Dictionary of OCEAN scores.
+        use_cache (bool): Serve and store the report through the report cache.
+        llm: Chat model to use instead of Gemini (e.g. `StubChatModel`).
+    """
+    counters = {}
+    return timed_iter("llm_analysis", _stream_analysis(scores, use_cache, llm, counters), counters=counters)
+
+
+def _stream_analysis(scores, use_cache, llm, counters):
+    model = MODEL_NAME if llm is None else llm._llm_type
+    cache = get_report_cache() if use_cache else None
+    key = cache.key(scores, model) if cache else None
+    cached = cache.get(key) if cache else None
+    if cache: counters['cache_hits' if cached is not None else 'cache_misses'] = 1
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        chain = get_chain() if llm is None else build_chain(llm)
+        for chunk in chain.stream({"scores_context": format_scores(scores)},
+                                  config={"callbacks": [UsageCounter(counters)]}):
+            parts.append(chunk)
+            yield chunk
     except Exception as e:
-        return f"Error generating report: {str(e)}"
+        yield f"\n\nError generating report: {str(e)}"
+        return
+    if cache:
+        cache.set(key, "".join(parts))
+
+
+# --- BATCH ANALYSIS ---
+
+# HTTP statuses and Google API error types worth retrying.
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+TRANSIENT_NAMES = {"ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+                   "TooManyRequests"}
+
+
+def is_transient(exc):
+    """Whether a failed model call is worth retrying."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)): return True
+    status = getattr(exc, 'status_code', None) or getattr(exc, 'code', None)
+    return status in TRANSIENT_STATUS or type(exc).__name__ in TRANSIENT_NAMES
+
+
+class RateLimiter:
+    """Spaces request starts at least 1 / `rate` seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def llm_analysis_batch(score_profiles, concurrency=8, rate_limit=None, retries=3, timeout=60.0,
+                             backoff=1.0, llm=None, use_cache=True):
+    """
+    Generates reports for many score profiles concurrently.
+
+    Args:
+        score_profiles (list): Score dicts, as accepted by `llm_analysis`.
+        concurrency (int): Maximum number of model calls in flight.
+        rate_limit (float): Maximum request starts per second (None: unlimited).
+        retries (int): Extra attempts after a transient failure or timeout.
+        timeout (float): Seconds allowed per attempt.
+        backoff (float): Base delay of the exponential backoff, in seconds.
+        llm: Chat model to use instead of Gemini (e.g. `StubChatModel`).
+        use_cache (bool): Serve and store reports through the report cache.
+
+    Returns:
+        list: One dict per profile, in input order, with keys 'ok', 'report',
+        'error', 'attempts', 'cached' and 'seconds'.
+    """
+    chain = get_chain() if llm is None else build_chain(llm)
+    model = MODEL_NAME if llm is None else llm._llm_type
+    cache = get_report_cache() if use_cache else None
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    async def run_one(scores):
+        start = time.perf_counter()
+        result = {'ok': False, 'report': None, 'error': None, 'attempts': 0, 'cached': False}
+        key = cache.key(scores, model) if cache else None
+        # The cache is SQLite-backed: keep its (possibly lock-waiting) calls off the event loop.
+        cached = await asyncio.to_thread(cache.get, key) if cache else None
+        if cached is not None:
+            result.update(ok=True, report=cached, cached=True)
+        else:
+            async with semaphore:
+                for attempt in range(retries + 1):
+                    if limiter: await limiter.wait()
+                    result['attempts'] = attempt + 1
+                    try:
+                        report = await asyncio.wait_for(
+                            chain.ainvoke({"scores_context": format_scores(scores)}), timeout)
+                    except Exception as e:
+                        result['error'] = f"{type(e).__name__}: {e}"
+                        if attempt == retries or not is_transient(e): break
+                        await asyncio.sleep(backoff * 2 ** attempt + random.uniform(0, backoff))
+                        continue
+                    result.update(ok=True, report=report, error=None)
+                    if cache: await asyncio.to_thread(cache.set, key, report)
+                    break
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    return await asyncio.gather(*(run_one(scores) for scores in score_profiles))
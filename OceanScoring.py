@@ -0,0 +1,143 @@
+import argparse
+import os
+import re
+import time
+import numpy as np
+
+scoring_map = {
+    "Extraversion": [1, "6R", 11, 16, "21R", 26, "31R", 36],
+    "Agreeableness": ["2R", 7, "12R", 17, 22, "27R", 32, "37R", 42],
+    "Conscientiousness": [3, "8R", 13, "18R", "23R", 28, 33, 38, "43R"],
+    "Neuroticism": [4, "9R", 14, 19, "24R", 29, "34R", 39],
+    "Openness": [5, 10, 15, 20, 25, 30, "35R", 40, "41R", 44]
+}
+
+# Trait order used by the report and the LLM prompt.
+OCEAN_ORDER = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
+
+NUM_ITEMS = 44
+MISSING_ANSWER = 3
+
+
+def compile_scoring_map(mapping):
+    """
+    Compiles a scoring map into flat arrays for vectorized scoring.
+
+    Returns:
+        dict: 'traits' (names in map order), 'items' (0-based item column of
+        every keyed item, grouped by trait), 'signs' (+1 or -1 for reverse
+        keyed items), 'starts' (offset of each trait's group in 'items') and
+        'counts' (items per trait).
+    """
+    traits, items, signs, counts = [], [], [], []
+    for trait, keyed in mapping.items():
+        traits.append(trait)
+        counts.append(len(keyed))
+        for item in keyed:
+            reverse = isinstance(item, str) and item.endswith('R')
+            items.append(int(str(item).rstrip('R')) - 1)
+            signs.append(-1 if reverse else 1)
+    counts = np.array(counts)
+    return {'traits': traits, 'items': np.array(items), 'signs': np.array(signs, dtype=np.float64),
+            'starts': np.concatenate(([0], np.cumsum(counts)[:-1])), 'counts': counts}
+
+
+COMPILED = compile_scoring_map(scoring_map)
+
+
+def score_matrix(responses, compiled=COMPILED):
+    """
+    Scores an (N respondents x 44 items) response matrix in one pass.
+
+    Missing answers (NaN) count as 3, reverse keyed items score 6 - answer,
+    and each trait is normalized to 0-100 exactly like the interactive app.
+
+    Returns:
+        np.ndarray: (N x traits) normalized scores, columns in
+        `compiled['traits']` order, rounded to one decimal.
+    """
+    x = np.asarray(responses, dtype=np.float64)
+    if x.ndim == 1: x = x[None, :]
+    x = np.where(np.isnan(x), MISSING_ANSWER, x)[:, compiled['items']]
+    # 6 - a for reverse keyed items, a otherwise.
+    keyed = x * compiled['signs'] + 6 * (compiled['signs'] < 0)
+    raw = np.add.reduceat(keyed, compiled['starts'], axis=1)
+    n = compiled['counts']
+    return np.round((raw - n) / (n * 4) * 100, 1)
+
+
+def score_answers(answers, compiled=COMPILED):
+    """
+    Scores one respondent's {item number (1-44): answer (1-5)} dict.
+    Raises ValueError for items or answers out of range.
+    """
+    row = np.full(NUM_ITEMS, np.nan)
+    for item, value in answers.items():
+        item, value = int(item), float(value)
+        if not 1 <= item <= NUM_ITEMS: raise ValueError(f"item {item} is not between 1 and {NUM_ITEMS}")
+        if not 1 <= value <= 5: raise ValueError(f"answer {value:g} to item {item} is not between 1 and 5")
+        row[item - 1] = value
+    return {trait: float(s) for trait, s in zip(compiled['traits'], score_matrix(row, compiled)[0])}
+
+
+# --- BATCH SCORING CLI ---
+
+def item_columns(columns):
+    """Maps item numbers to input columns named '1'..'44' or 'q1'..'q44'."""
+    found = {}
+    for col in columns:
+        m = re.fullmatch(r'[qQ]?(\d+)', str(col))
+        if m and 1 <= int(m.group(1)) <= NUM_ITEMS:
+            found[int(m.group(1))] = col
+    missing = sorted(set(range(1, NUM_ITEMS + 1)) - set(found))
+    if missing:
+        raise ValueError(f"Input is missing item columns: {missing}")
+    return [found[i] for i in range(1, NUM_ITEMS + 1)]
+
+
+def iter_response_chunks(path, chunksize=100_000):
+    """Yields the input file as pandas DataFrames of at most `chunksize` rows."""
+    import pandas as pd
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def score_file(input_path, output_path, chunksize=100_000, id_column=None):
+    """Streams a CSV/Parquet response export through `score_matrix`."""
+    import pandas as pd
+    writer, rows = None, 0
+    if os.path.exists(output_path): os.remove(output_path)
+    for chunk in iter_response_chunks(input_path, chunksize):
+        cols = item_columns(chunk.columns)
+        scores = score_matrix(chunk[cols].to_numpy(dtype=np.float64, na_value=np.nan))
+        out = pd.DataFrame(scores, columns=COMPILED['traits'])[OCEAN_ORDER]
+        if id_column:
+            out.insert(0, id_column, chunk[id_column].to_numpy())
+        if output_path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(out, preserve_index=False)
+            writer = writer or pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+        else:
+            out.to_csv(output_path, mode='a', header=rows == 0, index=False)
+        rows += len(out)
+    if writer: writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet export of BFI responses.")
+    parser.add_argument("input", help="Responses with item columns 1..44 or q1..q44")
+    parser.add_argument("output", help="Output .csv or .parquet with one row of trait scores per respondent")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows scored per chunk")
+    parser.add_argument("--id-column", help="Input column copied to the output to identify respondents")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    count = score_file(args.input, args.output, args.chunksize, args.id_column)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {count} respondents in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f}/s).")
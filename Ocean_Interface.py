@@ -1,13 +1,16 @@
-import streamlit as st
-import pandas as pd
-import altair as alt
-from ReportGeneration import generate_html_report
-from OceanModel import llm_analysis
-import cv2
-import numpy as np
-import matplotlib.pyplot as plt
-import random
 import os
+import streamlit as st
+
+# Streamlit re-executes this script on every click. Only the question UI runs
+# on most of them, so the heavy modules (pandas, altair, OpenCV, matplotlib,
+# LangChain) are imported inside the results/report functions below, and
+# whatever those load is kept in Streamlit's resource cache.
+
+VIDEO_PATH = "Emotional_Behaviour/video.mp4"
+SIGNALS_PATH = "Emotional_Behaviour"
+# When set (e.g. http://127.0.0.1:8080), reports are generated by ReportService
+# and this app only renders the UI.
+REPORT_SERVICE_URL = os.getenv("OCEAN_REPORT_SERVICE")
 
 #  1. PAGE CONFIGURATION
 st.set_page_config(page_title="Personality Assessment", layout="wide")
@@ -54,47 +57,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- 3. HELPER FUNCTIONS FOR VIDEO/PLOTS ---
-
-def get_frame(video_path, timestamp_sec, is_thermal=False):
-    if not os.path.exists(video_path): return None
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30
-    cap.set(cv2.CAP_PROP_POS_FRAMES, int(fps * timestamp_sec))
-    success, frame = cap.read()
-    cap.release()
-    if success:
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        if is_thermal:
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            frame = cv2.applyColorMap(gray, cv2.COLORMAP_JET)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return frame
-    return None
-
-
-def create_emotion_plot(valence_data, arousal_data, current_idx):
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(4, 4))
-    fig.patch.set_facecolor('#161b22')
-    ax.set_facecolor('#161b22')
-    ax.set_xlim(-1.1, 1.1)
-    ax.set_ylim(-1.1, 1.1)
-    ax.grid(True, linestyle='--', alpha=0.1, color='#8b949e')
-    ax.axhline(0, color='#30363d', linewidth=1.5)
-    ax.axvline(0, color='#30363d', linewidth=1.5)
-    ax.plot(valence_data, arousal_data, color='#58a6ff', alpha=0.15, linewidth=1)
-    cur_val, cur_ar = valence_data[current_idx], arousal_data[current_idx]
-    ax.scatter([cur_val], [cur_ar], color='#ff7b72', s=120, zorder=5, edgecolors='white')
-    labels = [("Excited", 0.7, 0.7, "#7ee787"), ("Stressed", -0.7, 0.7, "#ff7b72"),
-              ("Depressed", -0.7, -0.7, "#a5d6ff"), ("Relaxed", 0.7, -0.7, "#d2a8ff")]
-    for text, x, y, col in labels:
-        ax.text(x, y, text, fontsize=9, color=col, alpha=0.7, ha='center', weight='bold')
-    plt.tight_layout()
-    return fig
-
-
-# --- 4. QUESTION DATA ---
+# --- 3. QUESTION DATA ---
 questions = [
     "Is talkative", "Tends to find fault with others", "Does a thorough job",
     "Is depressed, blue", "Is original, comes up with new ideas", "Is reserved",
@@ -114,14 +77,6 @@ questions = [
     "Is easily distracted", "Is sophisticated in art, music, or literature"
 ]
 
-scoring_map = {
-    "Extraversion": [1, "6R", 11, 16, "21R", 26, "31R", 36],
-    "Agreeableness": ["2R", 7, "12R", 17, 22, "27R", 32, "37R", 42],
-    "Conscientiousness": [3, "8R", 13, "18R", "23R", 28, 33, 38, "43R"],
-    "Neuroticism": [4, "9R", 14, 19, "24R", 29, "34R", 39],
-    "Openness": [5, 10, 15, 20, 25, 30, "35R", 40, "41R", 44]
-}
-
 options = ["Disagree Strongly", "Disagree a Little", "Neither Agree nor Disagree", "Agree a Little", "Agree Strongly"]
 values = [1, 2, 3, 4, 5]
 
@@ -129,15 +84,66 @@ if 'current_step' not in st.session_state: st.session_state.current_step = 0
 if 'answers' not in st.session_state: st.session_state.answers = {}
 
 
-def get_score(idx):
-    if isinstance(idx, str) and 'R' in idx:
-        return 6 - st.session_state.answers.get(int(idx.replace('R', '')), 3)
-    elif isinstance(idx, int):
-        return st.session_state.answers.get(idx, 3)
-    return 0
+@st.cache_resource
+def load_emotion_signals():
+    """Memory-mapped signal store shared by every session in the process."""
+    from SignalStore import EmotionSignalStore
+    store = EmotionSignalStore.open(SIGNALS_PATH, duration=video_duration(VIDEO_PATH))
+    return store, store.overview()
+
+
+@st.cache_resource
+def load_emotion_analytics():
+    """Timeline summary and most salient snapshot samples of the recording."""
+    from EmotionAnalytics import salient_indices, summarize_emotions
+    store, _ = load_emotion_signals()
+    summary = summarize_emotions(store.valence, store.arousal, store.sample_rate)
+    return summary, salient_indices(store.valence, store.arousal, count=10)
+
+
+@st.cache_data
+def video_duration(video_path):
+    """Duration from the persistent seek index; no VideoCapture probing."""
+    from VideoIndex import load_index
+    index = load_index(video_path)
+    return index.duration if index else 0.0
 
 
-# 5. MAIN LAYOUT
+@st.cache_resource
+def get_report_client():
+    from ReportClient import ReportClient
+    return ReportClient(REPORT_SERVICE_URL)
+
+
+def generate_remote_report(normalized_results, profile):
+    """Has ReportService build the report; this process only waits for the HTML."""
+    from OceanScoring import OCEAN_ORDER
+    from ReportClient import ServiceError
+    scores_dict = {trait: normalized_results.get(trait, 0) for trait in OCEAN_ORDER}
+    with st.status("Generating report on the report service...", expanded=True) as status:
+        try:
+            html_content = get_report_client().report(scores_dict, profile=profile, deadline=180)['html']
+        except (ServiceError, OSError) as e:
+            status.update(label=f"Report service error: {e}", state="error")
+            st.stop()
+        status.update(label="Report ready.", state="complete", expanded=False)
+    return html_content
+
+
+@st.cache_resource
+def warm_report_resources():
+    """Imports the report stack and builds the LLM chain once per process."""
+    import ReportGeneration  # noqa: F401
+    import ReportPipeline  # noqa: F401
+    from OceanModel import get_chain
+    try:
+        get_chain()
+    except Exception:
+        pass  # Reported by the analysis stream when the report is generated.
+    return True
+
+
+# 4. MAIN LAYOUT
 def main():
     col_l, col_center, col_r = st.columns([1, 6, 1])
     with col_center:
@@ -169,13 +175,19 @@ def main():
 
 
 def display_results():
-    normalized_results = {}
-    for trait, items in scoring_map.items():
-        raw_score = sum(get_score(i) for i in items)
-        normalized_results[trait] = round(((raw_score - len(items)) / (len(items) * 4)) * 100, 1)
+    import altair as alt
+    import pandas as pd
+    from Instrumentation import record_report
+    from OceanModel import llm_analysis_stream
+    from OceanScoring import OCEAN_ORDER, score_answers
+    from ReportGeneration import REPORT_PROFILES, generate_html_report
+    from ReportPipeline import ReportPipeline, assemble_snapshots, start_snapshot_stages
+
+    normalized_results = score_answers(st.session_state.answers)
 
     st.session_state.final_results = normalized_results
     st.success("Assessment Complete.")
+    if not REPORT_SERVICE_URL: warm_report_resources()
     df_scores = pd.DataFrame(list(normalized_results.items()), columns=['Trait', 'Score (%)'])
 
     col1, col2 = st.columns([3, 2])
@@ -194,40 +206,52 @@ def display_results():
             **{'color': 'black', 'background-color': '#ffffff', 'border': '1px solid #eee'}), use_container_width=True,
                      hide_index=True)
 
-    if st.button("Generate Full Analysis"):
-        with st.spinner("Analyzing Behavior & Generating Report..."):
-            ocean_order = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
-            scores_array = [normalized_results.get(trait, 0) for trait in ocean_order]
-            scores_dict = dict(zip(ocean_order, scores_array))
+    profile = st.selectbox("Report size", list(REPORT_PROFILES), index=1,
+                           help="Snapshot resolution and compression used in the HTML report.")
+    generate = st.button("Generate Full Analysis")
+    if generate and REPORT_SERVICE_URL:
+        html_content = generate_remote_report(normalized_results, profile)
+    elif generate:
+        with st.status("Analyzing Behavior & Generating Report...", expanded=True) as status, \
+                record_report("Candidate Name") as metrics:
+            scores_array = [normalized_results.get(trait, 0) for trait in OCEAN_ORDER]
+            scores_dict = dict(zip(OCEAN_ORDER, scores_array))
 
             # Temporal Data Processing
-            arousal_data = np.load("Emotional_Behaviour/arousal.npy");
-            valence_data = np.load("Emotional_Behaviour/valence.npy")
-            min_len = min(len(arousal_data), len(valence_data))
-            indices = sorted(random.sample(range(min_len), 10))
-            cap = cv2.VideoCapture("Emotional_Behaviour/video.mp4");
-            duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / (cap.get(cv2.CAP_PROP_FPS) or 30);
-            cap.release()
-
-            report_snapshots = []
-            for idx in indices:
-                ts = (idx / min_len) * duration
-                report_snapshots.append({
-                    'time': f"{int(ts // 60)}:{int(ts % 60):02d}", 'valence': valence_data[idx],
-                    'arousal': arousal_data[idx],
-                    'rgb': get_frame("Emotional_Behaviour/video.mp4", ts), 'thermal': get_frame(
-                        "Emotional_Behaviour/video.mp4", ts, is_thermal=True),
-                    'plot': create_emotion_plot(valence_data, arousal_data, idx)
-                })
-
-            llm_analysis_text = llm_analysis(scores_dict)
+            store, trajectory = load_emotion_signals()
+            emotion_summary, indices = load_emotion_analytics()
+            valence_data, arousal_data = store.valence, store.arousal
+            timestamps = [store.timestamp(idx) for idx in indices]
+
+            # Snapshot work runs in the background while the analysis streams in
+            pipeline = ReportPipeline(progress=lambda stage, done, total: status.update(
+                label=f"Finished {stage} ({done}/{total})..."))
+            start_snapshot_stages(pipeline, VIDEO_PATH, valence_data, arousal_data,
+                                  indices, timestamps, profile, trajectory)
+            preview = st.empty()
+            with preview.container():
+                llm_analysis_text = st.write_stream(pipeline.relay(llm_analysis_stream(scores_dict)))
+            report_snapshots = assemble_snapshots(pipeline.join(), valence_data, arousal_data, indices, timestamps)
+
             # This calls the updated function where personality is at the TOP
-            html_content = generate_html_report("Candidate Name", scores_array, llm_analysis_text, report_snapshots)
+            html_content = generate_html_report("Candidate Name", scores_array, llm_analysis_text, report_snapshots,
+                                                profile=profile, emotion_summary=emotion_summary)
+            preview.empty()  # The full report below includes the analysis
+            status.update(label="Report ready.", state="complete", expanded=False)
+        st.session_state.report_metrics = metrics
 
-            st.download_button(label="Download Full Report HTML", data=html_content,
-                               file_name="Personality_Report.html", mime="text/html")
-            st.components.v1.html(html_content, height=1200, scrolling=True)
+    if generate:
+        st.download_button(label="Download Full Report HTML", data=html_content,
+                           file_name="Personality_Report.html", mime="text/html")
+        st.components.v1.html(html_content, height=1200, scrolling=True)
 
+    metrics = st.session_state.get('report_metrics')
+    if metrics and st.toggle("Show timing breakdown", help="Per-stage timings of the last generated report."):
+        st.caption(f"Last report took {metrics.wall:.2f}s end to end. Stage times include nested stages.")
+        st.dataframe(pd.DataFrame(list(metrics.summary().values())), hide_index=True, use_container_width=True)
+        st.download_button("Download stage metrics (JSON lines)", data=metrics.to_jsonl(),
+                           file_name="report_metrics.jsonl", mime="application/json")
+        st.code(metrics.to_prometheus(), language="text")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
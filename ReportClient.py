@@ -0,0 +1,50 @@
+import os
+import requests
+
+SERVICE_URL = os.getenv("OCEAN_REPORT_SERVICE")
+
+
+class ServiceError(RuntimeError):
+    """The report service answered with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ReportClient:
+    """
+    Thin HTTP client of ReportService, so the UI can hand all heavy work
+    to a separately scaled service. One pooled session per client.
+    """
+
+    def __init__(self, base_url=SERVICE_URL, timeout=None):
+        self.base_url, self.timeout = base_url.rstrip("/"), timeout
+        self.session = requests.Session()
+
+    def _post(self, path, payload, deadline=None):
+        if deadline: payload = dict(payload, deadline=deadline)
+        # Leave the service a little longer than its own deadline to answer 504.
+        timeout = self.timeout or ((deadline + 5) if deadline else None)
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=timeout)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+                # A 502 from /analysis carries the model error as its 'analysis' text.
+                message = body.get("error") or body.get("analysis") or response.text
+            except (AttributeError, ValueError):
+                message = response.text
+            raise ServiceError(response.status_code, message)
+        return response.json()
+
+    def score(self, answers):
+        return self._post("/score", {"answers": answers})["scores"]
+
+    def analysis(self, scores, deadline=None):
+        return self._post("/analysis", {"scores": scores}, deadline)["analysis"]
+
+    def report(self, scores, name="Candidate Name", profile=None, snapshots=True, deadline=None):
+        """{'html', 'analysis', 'cached', 'seconds'} for an OCEAN score dict."""
+        payload = {"scores": scores, "name": name, "snapshots": snapshots}
+        if profile: payload["profile"] = profile
+        return self._post("/report", payload, deadline)
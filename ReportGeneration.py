@@ -1,22 +1,61 @@
 import markdown2
-import matplotlib.pyplot as plt
 import numpy as np
 from jinja2 import Template
 import io
+import os
 import base64
+import hashlib
+import html
+import itertools
 import cv2
+from Instrumentation import instrument, nbytes, timed_iter
+from VideoProcessing import fit_width
 
+# Snapshot image settings per report size. Emotion plots always stay PNG
+# (flat colors and transparency compress better losslessly).
+REPORT_PROFILES = {
+    "full": {"max_width": None, "format": "png", "quality": None},
+    "standard": {"max_width": 640, "format": "jpg", "quality": 80},
+    "compact": {"max_width": 320, "format": "webp", "quality": 70},
+}
+DEFAULT_PROFILE = "full"
 
+_QUALITY_FLAGS = {"jpg": cv2.IMWRITE_JPEG_QUALITY, "webp": cv2.IMWRITE_WEBP_QUALITY}
+_MIME_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+_EMPTY = object()
+
+
+def encode_image(img_array, fmt='png', quality=None, max_width=None, order="rgb"):
+    """Encodes an RGB (or, with order='bgr', BGR) frame into image file bytes."""
+    img_array = fit_width(img_array, max_width)
+    bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR) if order == "rgb" else img_array
+    params = [_QUALITY_FLAGS[fmt], quality] if quality and fmt in _QUALITY_FLAGS else []
+    _, buffer = cv2.imencode('.' + fmt, bgr, params)
+    return buffer.tobytes()
+
+
+def image_format(data):
+    """Detects png/jpg/webp from encoded image bytes."""
+    if data[:4] == b'\x89PNG': return "png"
+    if data[:2] == b'\xff\xd8': return "jpg"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP': return "webp"
+    return "png"
+
+
+@instrument("ndarray_to_base64", size=len)
 def ndarray_to_base64(img_array):
     """Converts numpy video frames to base64 for the report."""
     if img_array is None: return ""
-    bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    _, buffer = cv2.imencode('.png', bgr)
-    return base64.b64encode(buffer).decode('utf-8')
+    if isinstance(img_array, str): return img_array  # Already base64 encoded
+    if isinstance(img_array, bytes): return base64.b64encode(img_array).decode('utf-8')
+    return base64.b64encode(encode_image(img_array)).decode('utf-8')
 
 
+@instrument("fig_to_base64", size=len)
 def fig_to_base64(fig):
     """Converts matplotlib emotion plots to base64 for the report."""
+    if isinstance(fig, (str, bytes)): return ndarray_to_base64(fig)  # Pre-rendered (e.g. by EmotionPlotRenderer)
+    import matplotlib.pyplot as plt
     buf = io.BytesIO()
     fig.savefig(buf, format='png', bbox_inches='tight', transparent=True)
     plt.close(fig)
@@ -24,61 +63,103 @@ def fig_to_base64(fig):
     return base64.b64encode(buf.read()).decode('utf-8')
 
 
-# --- YOUR ORIGINAL RADAR CHART ENGINE ---
+@instrument("snapshot_image", size=nbytes)
+def to_image_bytes(image, profile):
+    """Encoded bytes of a snapshot image (frame, encoded bytes or base64)."""
+    if image is None or isinstance(image, bytes): return image or b""
+    if isinstance(image, str): return base64.b64decode(image)
+    if isinstance(image, np.ndarray):
+        return encode_image(image, profile["format"], profile["quality"], profile["max_width"])
+    return base64.b64decode(fig_to_base64(image))
 
-def create_radar_chart_base64(scores):
-    labels = list(scores.keys())
-    values = list(scores.values())
-    values += values[:1]
-    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-    angles += angles[:1]
 
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    plt.xticks(angles[:-1], labels, color='#2c3e50', size=11, fontweight='bold')
-    ax.set_rlabel_position(30)
-    plt.yticks([20, 40, 60, 80, 100], ["20", "40", "60", "80", "100"], color="grey", size=9)
-    plt.ylim(0, 100)
+class AssetWriter:
+    """
+    Turns encoded images into `<img src>` values.
 
-    ax.plot(angles, values, linewidth=2.5, linestyle='solid', color='#2c3e50')
-    ax.fill(angles, values, alpha=0.3, color='#3498db')
-    plt.title("Normalized Personality Profile", y=1.08, fontsize=14, fontweight='bold', color='#2c3e50')
+    Inline (default) produces data URIs. With `assets_dir`, each distinct image
+    is written once as `<content hash>.<ext>` and referenced by a path relative
+    to the report, which is expected to be saved in the parent of `assets_dir`.
+    """
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', transparent=True)
-    plt.close()
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    def __init__(self, assets_dir=None):
+        self.assets_dir = assets_dir
+        if assets_dir: os.makedirs(assets_dir, exist_ok=True)
 
+    def src(self, data):
+        if not data: return ""
+        fmt = image_format(data)
+        if not self.assets_dir:
+            return f"data:{_MIME_TYPES[fmt]};base64,{base64.b64encode(data).decode('utf-8')}"
+        name = f"{hashlib.sha1(data).hexdigest()[:16]}.{fmt}"
+        path = os.path.join(self.assets_dir, name)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        return f"{os.path.basename(os.path.normpath(self.assets_dir))}/{name}"
 
-# --- INTEGRATED REPORT GENERATION FUNCTION ---
 
-def generate_html_report(candidate_name, scores_array, llm_analysis_text, temporal_snapshots=None):
-    # 1. Map Big Five Scores
-    scores_array = (scores_array + [0] * 5)[:5]
-    traits = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
-    scores_dict = {traits[i]: round(scores_array[i], 1) for i in range(5)}
+# --- SVG RADAR CHART (no matplotlib) ---
 
-    # 2. Generate Personality Chart
-    chart_base64 = create_radar_chart_base64(scores_dict)
+@instrument("radar_chart", size=len)
+def create_radar_chart_svg(scores, size=480):
+    """
+    Inline SVG version of the radar chart, styled like the matplotlib one it
+    replaced (kept as the baseline in Benchmarks.radar_chart_png).
 
-    # 3. Process Snapshots (Integrating your Thermal/Arousal/Valence data)
-    processed_snaps = []
-    if temporal_snapshots:
-        for s in temporal_snapshots:
-            processed_snaps.append({
-                "time": s['time'],
-                "v": round(s['valence'], 2),
-                "a": round(s['arousal'], 2),
-                "rgb": ndarray_to_base64(s['rgb']),
-                "therm": ndarray_to_base64(s['thermal']),
-                "plot": fig_to_base64(s['plot'])
-            })
+    Axes start at 3 o'clock and run counter-clockwise like a polar plot, with
+    rings and 0-100 tick labels every 20 points along the 30 degree spoke.
+    """
+    labels = list(scores.keys())
+    values = np.clip(np.array(list(scores.values()), dtype=np.float64), 0, 100)
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False)
+    cx, cy, radius = size / 2, size / 2 + 20, size * 0.34
 
-    # 4. Process Markdown Analysis
-    html_details = markdown2.markdown(llm_analysis_text)
+    def point(r, theta):
+        return cx + radius * r / 100 * np.cos(theta), cy - radius * r / 100 * np.sin(theta)
+
+    def path(r, thetas):
+        xs, ys = point(r, thetas)
+        return " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+
+    # Side margins leave room for the trait labels left and right of the rings.
+    margin = 80
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{-margin} 0 {size + 2 * margin} {size + 20}" '
+             f'width="100%" style="max-width: {size + 2 * margin}px" font-family="DejaVu Sans, Helvetica, Arial, sans-serif" role="img" '
+             f'aria-label="Normalized Personality Profile">',
+             f'<text x="{cx}" y="24" text-anchor="middle" font-size="19" font-weight="bold" '
+             f'fill="#2c3e50">Normalized Personality Profile</text>',
+             '<g fill="none" stroke="#b0b0b0" stroke-width="0.8">']
+    for ring in range(20, 101, 20):
+        parts.append(f'<circle cx="{cx}" cy="{cy}" r="{radius * ring / 100:.1f}"/>')
+    for theta in angles:
+        x, y = point(100, theta)
+        parts.append(f'<line x1="{cx}" y1="{cy}" x2="{x:.1f}" y2="{y:.1f}"/>')
+    parts.append('</g>')
+
+    tick_theta = np.radians(30)
+    for ring in range(20, 101, 20):
+        x, y = point(ring, tick_theta)
+        parts.append(f'<text x="{x:.1f}" y="{y:.1f}" font-size="12" fill="grey">{ring}</text>')
 
-    # 5. YOUR ORIGINAL CSS (With Snapshot addition)
-    css_style = """
+    polygon = path(values, angles)
+    parts.append(f'<polygon points="{polygon}" fill="#3498db" fill-opacity="0.3" stroke="#2c3e50" '
+                 f'stroke-width="3" stroke-linejoin="round"/>')
+
+    for label, theta in zip(labels, angles):
+        x, y = point(112, theta)
+        cos = np.cos(theta)
+        anchor = "start" if cos > 0.1 else "end" if cos < -0.1 else "middle"
+        parts.append(f'<text x="{x:.1f}" y="{y + 5:.1f}" text-anchor="{anchor}" font-size="15" '
+                     f'font-weight="bold" fill="#2c3e50">{html.escape(label)}</text>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+# --- REPORT TEMPLATE (compiled once per process) ---
+
+# YOUR ORIGINAL CSS (With Snapshot addition)
+REPORT_CSS = """
     :root {
         --primary-color: #2c3e50;
         --secondary-color: #3498db;
@@ -93,7 +174,9 @@ def generate_html_report(candidate_name, scores_array, llm_analysis_text, tempor
     .header h1 { color: var(--primary-color); margin: 0; font-size: 32px; font-weight: 800; }
     .header h2 { color: var(--accent-color); margin-top: 10px; font-size: 18px; text-transform: uppercase; }
 
-    .snapshot-section { margin-bottom: 40px; }
+    .snapshot-section { margin-top: 50px; margin-bottom: 40px; border-top: 2px solid #ecf0f1; padding-top: 30px; }
+    .snapshot-section h3, .emotion-section h3 { color: #2c3e50; margin-bottom: 20px; }
+    .emotion-section { margin-top: 50px; border-top: 2px solid #ecf0f1; padding-top: 30px; }
     .snapshot-card { display: flex; gap: 15px; border: 1px solid #ecf0f1; border-radius: 10px; padding: 15px; margin-bottom: 15px; align-items: center; page-break-inside: avoid; }
     .snap-info { flex: 0.7; border-right: 2px solid #ecf0f1; padding-right: 10px; font-size: 14px; color: var(--primary-color); }
     .snap-box { flex: 2; text-align: center; }
@@ -110,9 +193,7 @@ def generate_html_report(candidate_name, scores_array, llm_analysis_text, tempor
     @media print { .no-print { display: none; } .report-container { box-shadow: none; border: none; width: 100% !important; } }
     """
 
-    # Inside your generate_html_report function in ReportGeneration.py
-
-    template_str = """
+REPORT_TEMPLATE = Template("""
     <!DOCTYPE html>
     <html>
     <head><style>{{ css }}</style></head>
@@ -120,12 +201,12 @@ def generate_html_report(candidate_name, scores_array, llm_analysis_text, tempor
         <div class="report-container">
             <div class="header">
                 <h1>Comprehensive Personality Assessment</h1>
-                <h2>Prepared for: Harshit</h2>
+                <h2>Prepared for: {{ name | e }}</h2>
             </div>
 
             <div class="top-layout">
                 <div class="chart-section">
-                    <img src="data:image/png;base64,{{ chart_data }}" alt="Radar Chart">
+                    {{ chart_svg }}
                 </div>
                 <div class="score-card">
                     <h3>Trait Breakdown (0-100%)</h3>
@@ -142,17 +223,35 @@ def generate_html_report(candidate_name, scores_array, llm_analysis_text, tempor
                 {{ details_html }}
             </div>
 
+            {% if emotion %}
+            <div class="emotion-section">
+                <h3>Emotion Timeline Summary</h3>
+                <div class="score-card">
+                    {% for quadrant, share in emotion.dwell_share.items() %}
+                    <div class="score-row">
+                        <span class="score-label">{{ quadrant }}</span>
+                        <span class="score-value">{{ (share * 100) | round(1) }}% ({{ emotion.dwell_seconds[quadrant] | round(1) }}s)</span>
+                    </div>
+                    {% endfor %}
+                    <div class="score-row"><span class="score-label">Mean valence / arousal</span><span class="score-value">{{ emotion.valence_mean | round(2) }} / {{ emotion.arousal_mean | round(2) }}</span></div>
+                    <div class="score-row"><span class="score-label">Peak rolling spread (valence / arousal)</span><span class="score-value">{{ emotion.max_rolling_valence_std | round(2) }} / {{ emotion.max_rolling_arousal_std | round(2) }}</span></div>
+                    <div class="score-row"><span class="score-label">Quadrant transitions</span><span class="score-value">{{ emotion.transitions }}</span></div>
+                    <div class="score-row"><span class="score-label">Arousal peaks / change points</span><span class="score-value">{{ emotion.arousal_peaks }} / {{ emotion.change_points }}</span></div>
+                </div>
+            </div>
+            {% endif %}
+
             {% if snapshots %}
-            <div class="snapshot-section" style="margin-top: 50px; border-top: 2px solid #ecf0f1; padding-top: 30px;">
-                <h3 style="color: #2c3e50; margin-bottom: 20px;">Temporal Emotion & Behavioral Analysis</h3>
+            <div class="snapshot-section">
+                <h3>Temporal Emotion & Behavioral Analysis</h3>
                 {% for snap in snapshots %}
-                <div class="snapshot-card" style="display: flex; gap: 15px; border: 1px solid #ecf0f1; border-radius: 10px; padding: 15px; margin-bottom: 15px; align-items: center;">
-                    <div class="snap-info" style="flex: 0.7; border-right: 2px solid #ecf0f1; padding-right: 10px;">
+                <div class="snapshot-card">
+                    <div class="snap-info">
                         <strong>{{ snap.time }}</strong><br>V: {{ snap.v }}<br>A: {{ snap.a }}
                     </div>
-                    <div class="snap-box" style="flex: 2; text-align: center;"><img src="data:image/png;base64,{{ snap.rgb }}" style="width:100%;"><span>OPTICAL</span></div>
-                    <div class="snap-box" style="flex: 2; text-align: center;"><img src="data:image/png;base64,{{ snap.therm }}" style="width:100%;"><span>THERMAL</span></div>
-                    <div class="snap-box" style="flex: 2; text-align: center;"><img src="data:image/png;base64,{{ snap.plot }}" style="width:100%;"><span>MAPPING</span></div>
+                    <div class="snap-box"><img src="{{ snap.rgb }}" loading="lazy"><span>OPTICAL</span></div>
+                    <div class="snap-box"><img src="{{ snap.therm }}" loading="lazy"><span>THERMAL</span></div>
+                    <div class="snap-box"><img src="{{ snap.plot }}" loading="lazy"><span>MAPPING</span></div>
                 </div>
                 {% endfor %}
             </div>
@@ -160,9 +259,96 @@ def generate_html_report(candidate_name, scores_array, llm_analysis_text, tempor
         </div>
     </body>
     </html>
+    """)
+
+
+# --- INTEGRATED REPORT GENERATION FUNCTION ---
+
+def _peek(iterable):
+    """None when `iterable` is empty, else an iterator over all of it."""
+    if iterable is None: return None
+    it = iter(iterable)
+    first = next(it, _EMPTY)
+    return None if first is _EMPTY else itertools.chain([first], it)
+
+
+def iter_html_report(candidate_name, scores_array, llm_analysis_text, temporal_snapshots=None,
+                     profile=DEFAULT_PROFILE, assets_dir=None, emotion_summary=None):
     """
+    Renders the HTML report as a stream of text chunks.
 
-    return Template(template_str).render(
-        css=css_style, name=candidate_name, chart_data=chart_base64,
-        scores_dict=scores_dict, details_html=html_details, snapshots=processed_snaps
-    )
\ No newline at end of file
+    `temporal_snapshots` may be any iterable (e.g. a generator); each
+    snapshot is converted and its images encoded only when the template
+    reaches it, so memory stays flat however many snapshots a report has.
+    Arguments are as for `generate_html_report`.
+    """
+    settings = REPORT_PROFILES[profile]
+    assets = AssetWriter(assets_dir)
+
+    # 1. Map Big Five Scores
+    scores_array = (list(scores_array) + [0] * 5)[:5]
+    traits = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
+    scores_dict = {traits[i]: round(scores_array[i], 1) for i in range(5)}
+
+    # 2. Generate Personality Chart
+    chart_svg = create_radar_chart_svg(scores_dict)
+
+    # 3. Process Snapshots (Integrating your Thermal/Arousal/Valence data)
+    def processed_snaps(snapshots):
+        for s in snapshots:
+            yield {
+                "time": s['time'],
+                "v": round(s['valence'], 2),
+                "a": round(s['arousal'], 2),
+                "rgb": assets.src(to_image_bytes(s['rgb'], settings)),
+                "therm": assets.src(to_image_bytes(s['thermal'], settings)),
+                "plot": assets.src(to_image_bytes(s['plot'], settings))
+            }
+
+    snapshots = _peek(temporal_snapshots)
+
+    # 4. Process Markdown Analysis
+    html_details = markdown2.markdown(llm_analysis_text)
+
+    return timed_iter("jinja_render", REPORT_TEMPLATE.generate(
+        css=REPORT_CSS, name=candidate_name, chart_svg=chart_svg,
+        scores_dict=scores_dict, details_html=html_details,
+        snapshots=processed_snaps(snapshots) if snapshots else None,
+        emotion=emotion_summary
+    ))
+
+
+def write_html_report(dest, *args, **kwargs):
+    """
+    Streams the report into `dest`: a path, or an open text file (anything
+    with a `write(str)` method). Remaining arguments are as for
+    `generate_html_report`.
+
+    Returns:
+        int: Characters written.
+    """
+    if isinstance(dest, (str, os.PathLike)):
+        with open(dest, 'w', encoding='utf-8') as f:
+            return write_html_report(f, *args, **kwargs)
+    written = 0
+    for chunk in iter_html_report(*args, **kwargs):
+        dest.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def generate_html_report(candidate_name, scores_array, llm_analysis_text, temporal_snapshots=None,
+                         profile=DEFAULT_PROFILE, assets_dir=None, emotion_summary=None):
+    """
+    Renders the full HTML report.
+
+    Snapshot 'rgb'/'thermal' values may be RGB frames (encoded with the
+    size `profile` from REPORT_PROFILES), encoded image bytes or base64 PNG;
+    'plot' may be a matplotlib figure, bytes or base64 PNG. With `assets_dir`
+    images are written there (deduplicated) instead of inlined.
+    `emotion_summary` (from EmotionAnalytics.summarize_emotions) adds the
+    emotion timeline section. Use `write_html_report` or `iter_html_report`
+    to stream large reports instead of building one string.
+    """
+    return "".join(iter_html_report(candidate_name, scores_array, llm_analysis_text, temporal_snapshots,
+                                    profile, assets_dir, emotion_summary))
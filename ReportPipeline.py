@@ -0,0 +1,188 @@
+import argparse
+import contextvars
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from EmotionPlot import EmotionPlotRenderer, render_emotion_plots
+from OceanModel import llm_analysis
+from ReportGeneration import DEFAULT_PROFILE, REPORT_PROFILES, write_html_report
+from SnapshotCache import encode_snapshot_frames
+
+
+class ReportPipeline:
+    """
+    Runs independent report stages concurrently and joins them before rendering.
+
+    Stages are started with `start` and run in a thread pool: the LLM request
+    is network-bound, and frame decoding/encoding (OpenCV) and plot rendering
+    (Agg) spend most of their time in native code, so they overlap well.
+    End-to-end time approaches the slowest stage instead of the sum of all.
+
+    Args:
+        max_workers (int): Threads available to the stages.
+        progress (callable): Called as progress(stage_name, finished_count,
+            total_count) for each finished stage, on the thread that calls
+            `poll`, `relay` or `join` (e.g. a Streamlit script thread) once
+            the stage has ended.
+    """
+
+    def __init__(self, max_workers=4, progress=None):
+        self.progress = progress
+        self.timings = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._futures = {}
+        self._finished = queue.Queue()
+        self._reported = 0
+        self._started = time.perf_counter()
+
+    def start(self, name, fn, *args, **kwargs):
+        """Schedules `fn(*args, **kwargs)` as stage `name`."""
+        def timed():
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.timings[name] = time.perf_counter() - t0
+        # Run in a copy of the caller's context so stage metrics reach its report.
+        future = self._pool.submit(contextvars.copy_context().run, timed)
+        self._futures[future] = name
+        # Queued from the worker thread; reported by poll() on the caller's.
+        future.add_done_callback(lambda _: self._finished.put(name))
+        return self
+
+    def _report(self, name):
+        self._reported += 1
+        if self.progress: self.progress(name, self._reported, len(self._futures))
+
+    def poll(self):
+        """Reports the stages that finished since the last call, without waiting."""
+        while True:
+            try:
+                name = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            self._report(name)
+
+    def relay(self, iterable):
+        """Yields from `iterable`, reporting finished stages between items (e.g. streamed LLM chunks)."""
+        for item in iterable:
+            self.poll()
+            yield item
+        self.poll()
+
+    def join(self):
+        """Waits for every stage, reporting each as it ends, and returns {stage_name: result}."""
+        try:
+            while self._reported < len(self._futures):
+                self._report(self._finished.get())
+            results = {name: future.result() for future, name in self._futures.items()}
+        finally:
+            self._pool.shutdown(wait=True)
+        self.timings['total'] = time.perf_counter() - self._started
+        return results
+
+
+def format_timestamp(ts):
+    return f"{int(ts // 60)}:{int(ts % 60):02d}"
+
+
+def start_snapshot_stages(pipeline, video_path, valence_data, arousal_data, indices, timestamps,
+                          profile=DEFAULT_PROFILE, trajectory=None):
+    """Adds the 'frames' and 'plots' stages for the given snapshot samples."""
+    pipeline.start('frames', encode_snapshot_frames, video_path, timestamps, profile)
+    pipeline.start('plots', render_emotion_plots, valence_data, arousal_data, indices, trajectory)
+    return pipeline
+
+
+def assemble_snapshots(results, valence_data, arousal_data, indices, timestamps):
+    """Builds the snapshot dicts `generate_html_report` consumes."""
+    snapshots = []
+    for idx, ts, img, plot in zip(indices, timestamps, results['frames'], results['plots']):
+        snapshots.append({
+            'time': format_timestamp(ts), 'valence': float(valence_data[idx]), 'arousal': float(arousal_data[idx]),
+            'rgb': img['rgb'], 'thermal': img['thermal'], 'plot': plot
+        })
+    return snapshots
+
+
+def iter_report_snapshots(video_path, valence_data, arousal_data, indices, timestamps, profile=DEFAULT_PROFILE,
+                          trajectory=None, batch_size=16):
+    """
+    Lazily produces report snapshots, `batch_size` at a time, for streaming
+    reports over many timestamps (see `write_timeline_report`): only one batch of frames and plots is held in memory at any moment.
+    """
+    renderer = EmotionPlotRenderer(valence_data, arousal_data, trajectory=trajectory)
+    for lo in range(0, len(indices), batch_size):
+        batch_idx, batch_ts = indices[lo:lo + batch_size], timestamps[lo:lo + batch_size]
+        results = {'frames': encode_snapshot_frames(video_path, batch_ts, profile),
+                   'plots': [renderer.render(idx) for idx in batch_idx]}
+        yield from assemble_snapshots(results, valence_data, arousal_data, batch_idx, batch_ts)
+
+
+def run_report_pipeline(scores_dict, video_path, valence_data, arousal_data, indices, timestamps,
+                        analysis_fn=llm_analysis, progress=None, profile=DEFAULT_PROFILE):
+    """
+    Runs the LLM analysis and the snapshot stages concurrently.
+
+    Returns:
+        tuple: (analysis markdown, report snapshots, per-stage timings).
+    """
+    pipeline = ReportPipeline(progress=progress)
+    pipeline.start('analysis', analysis_fn, scores_dict)
+    start_snapshot_stages(pipeline, video_path, valence_data, arousal_data, indices, timestamps, profile)
+    results = pipeline.join()
+    snapshots = assemble_snapshots(results, valence_data, arousal_data, indices, timestamps)
+    return results['analysis'], snapshots, pipeline.timings
+
+
+def write_timeline_report(dest, video_path, signals_path, scores_array, count=100, name="Candidate Name",
+                          analysis="", profile=DEFAULT_PROFILE, assets_dir=None, batch_size=16):
+    """
+    Writes a report with `count` snapshots of a recording to `dest`. The most
+    salient moments are chosen, and snapshots are rendered batch by batch
+    while the HTML is written, so memory stays flat however many there are.
+
+    Returns:
+        int: Characters written.
+    """
+    from EmotionAnalytics import salient_indices, summarize_emotions
+    from SignalStore import EmotionSignalStore
+    from VideoIndex import load_index
+    index = load_index(video_path)
+    store = EmotionSignalStore.open(signals_path, duration=index.duration if index else None)
+    summary = summarize_emotions(store.valence, store.arousal, store.sample_rate)
+    indices = salient_indices(store.valence, store.arousal, count=count)
+    timestamps = [store.timestamp(idx) for idx in indices]
+    snapshots = iter_report_snapshots(video_path, store.valence, store.arousal, indices, timestamps, profile,
+                                      store.overview(), batch_size)
+    return write_html_report(dest, name, scores_array, analysis, snapshots, profile=profile,
+                             assets_dir=assets_dir, emotion_summary=summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write an HTML report with many snapshots of a recording.")
+    parser.add_argument("video", help="Recording the snapshots are taken from")
+    parser.add_argument("signals", help="Emotion signal store (valence.npy/arousal.npy or a chunked store)")
+    parser.add_argument("output", help="HTML file to write")
+    parser.add_argument("--scores", type=float, nargs=5, default=[50.0] * 5, metavar="SCORE",
+                        help="Percentiles in OCEAN order (default: 50 each)")
+    parser.add_argument("-n", "--snapshots", type=int, default=100, help="Number of snapshots (default: 100)")
+    parser.add_argument("--name", default="Candidate Name", help="Candidate name shown in the report")
+    parser.add_argument("--profile", choices=list(REPORT_PROFILES), default=DEFAULT_PROFILE,
+                        help="Snapshot resolution and compression")
+    parser.add_argument("--assets-dir", help="Write snapshot images here and link them instead of inlining")
+    parser.add_argument("--batch-size", type=int, default=16, help="Snapshots rendered per batch")
+    parser.add_argument("--llm", choices=["none", "stub", "gemini"], default="none",
+                        help="Written analysis: skip it, use the offline stub model, or call Gemini")
+    args = parser.parse_args()
+
+    from OceanScoring import OCEAN_ORDER
+    text = "_Written analysis was not generated for this report._"
+    if args.llm != "none":
+        from OceanModel import StubChatModel, llm_analysis_stream
+        model = StubChatModel() if args.llm == "stub" else None
+        text = "".join(llm_analysis_stream(dict(zip(OCEAN_ORDER, args.scores)), llm=model))
+    start = time.perf_counter()
+    size = write_timeline_report(args.output, args.video, args.signals, args.scores, args.snapshots, args.name,
+                                 text, args.profile, args.assets_dir, args.batch_size)
+    print(f"Wrote {size:,} characters to {args.output} in {time.perf_counter() - start:.2f}s")
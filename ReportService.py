@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from aiohttp import web
+from Instrumentation import prometheus_text
+from OceanModel import MODEL_NAME, StubChatModel, get_report_cache, llm_analysis_batch
+from OceanScoring import COMPILED, NUM_ITEMS, OCEAN_ORDER, score_answers, score_matrix
+from ReportGeneration import DEFAULT_PROFILE, REPORT_PROFILES
+
+VIDEO_PATH = os.getenv("OCEAN_VIDEO_PATH", "Emotional_Behaviour/video.mp4")
+SIGNALS_PATH = os.getenv("OCEAN_SIGNALS_PATH", "Emotional_Behaviour")
+DEFAULT_DEADLINE = 120.0
+# Errors raised by malformed request bodies; answered with 400.
+BAD_REQUEST = (KeyError, IndexError, TypeError, ValueError)
+SNAPSHOT_COUNT = 10
+
+
+# --- PROCESS POOL JOBS ---
+# Run in worker processes: each loads the recording once and keeps it.
+
+@functools.lru_cache(maxsize=4)
+def _load_recording(video_path, signals_path, count):
+    from EmotionAnalytics import salient_indices, summarize_emotions
+    from SignalStore import EmotionSignalStore
+    from VideoIndex import load_index
+    index = load_index(video_path)
+    store = EmotionSignalStore.open(signals_path, duration=index.duration if index else 0.0)
+    indices = salient_indices(store.valence, store.arousal, count=count)
+    summary = summarize_emotions(store.valence, store.arousal, store.sample_rate)
+    return store, store.overview(), indices, summary
+
+
+def build_snapshots(video_path, signals_path, profile, count=SNAPSHOT_COUNT):
+    """Worker: frames and emotion plots at the recording's salient moments."""
+    from ReportPipeline import assemble_snapshots
+    from EmotionPlot import render_emotion_plots
+    from SnapshotCache import encode_snapshot_frames
+    store, trajectory, indices, summary = _load_recording(video_path, signals_path, count)
+    timestamps = [store.timestamp(idx) for idx in indices]
+    results = {'frames': encode_snapshot_frames(video_path, timestamps, profile),
+               'plots': render_emotion_plots(store.valence, store.arousal, indices, trajectory)}
+    return assemble_snapshots(results, store.valence, store.arousal, indices, timestamps), summary
+
+
+def render_html(name, scores_array, analysis, snapshots, profile, emotion_summary):
+    """Worker: renders the HTML report."""
+    from ReportGeneration import generate_html_report
+    return generate_html_report(name, scores_array, analysis, snapshots, profile=profile,
+                                emotion_summary=emotion_summary)
+
+
+def _warm_worker(video_path, signals_path):
+    import ReportGeneration  # noqa: F401  (import cost paid at startup, not per request)
+    if video_path and os.path.exists(video_path):
+        _load_recording(video_path, signals_path, SNAPSHOT_COUNT)
+
+
+# --- LLM MICRO-BATCHING ---
+
+class AnalysisBatcher:
+    """
+    Coalesces analysis requests. Requests arriving within `window` seconds
+    are sent as one `llm_analysis_batch` call, and requests whose profiles
+    share a report-cache key (same quantized scores) share one model call,
+    including requests for a profile that is already in flight. All calls go
+    through the process-wide chain, so its HTTP client is pooled.
+    """
+
+    def __init__(self, window=0.02, max_batch=64, concurrency=8, llm=None, timeout=60.0):
+        self.window, self.max_batch, self.concurrency = window, max_batch, concurrency
+        self.llm, self.timeout = llm, timeout
+        self.model = MODEL_NAME if llm is None else llm._llm_type
+        self._queue = asyncio.Queue()
+        self._inflight = {}
+        self._task = None
+        # The loop only keeps weak references to tasks: hold the dispatches.
+        self._dispatches = set()
+        self.calls = self.coalesced = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [t for t in (self._task, *self._dispatches) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for future in self._inflight.values():  # Callers of cancelled dispatches must not hang.
+            future.cancel()
+
+    async def analyze(self, scores):
+        """The analysis result dict for `scores` (see llm_analysis_batch)."""
+        key = get_report_cache().key(scores, self.model)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._queue.put_nowait((key, scores, future))
+        else:
+            self.coalesced += 1
+        # Shielded: a caller hitting its deadline must not cancel the shared call.
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        self.calls += len(batch)
+        try:
+            results = await llm_analysis_batch([scores for _, scores, _ in batch], concurrency=self.concurrency,
+                                               timeout=self.timeout, llm=self.llm)
+        except Exception as e:
+            results = [{'ok': False, 'report': None, 'error': f"{type(e).__name__}: {e}", 'cached': False}] * len(batch)
+        for (key, _, future), result in zip(batch, results):
+            self._inflight.pop(key, None)
+            if not future.done(): future.set_result(result)
+
+
+# --- HTTP SERVICE ---
+
+class ReportService:
+    """
+    Scoring, analysis and report endpoints over aiohttp.
+
+    CPU-bound work (frame decoding, plots, HTML rendering) runs in a process
+    pool and LLM calls go through an `AnalysisBatcher`, so the event loop
+    only routes requests. At most `max_pending` analysis/report requests are
+    admitted at once; beyond that the service answers 503 with Retry-After
+    instead of queueing without bound. Each request has a deadline (the
+    'deadline' field or X-Request-Deadline header, in seconds) after which
+    it is answered with 504.
+    """
+
+    def __init__(self, workers=None, max_pending=32, batch_window=0.02, llm=None, video_path=VIDEO_PATH,
+                 signals_path=SIGNALS_PATH, default_deadline=DEFAULT_DEADLINE):
+        self.workers, self.max_pending = workers, max_pending
+        self.video_path, self.signals_path = video_path, signals_path
+        self.default_deadline = default_deadline
+        self.batcher = AnalysisBatcher(window=batch_window, llm=llm)
+        self.pool = None
+        self.pending = 0
+        self.counts = {'admitted': 0, 'rejected': 0, 'deadline_exceeded': 0}
+
+    def app(self):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.add_routes([web.get("/health", self.health), web.get("/metrics", self.metrics),
+                        web.post("/score", self.score), web.post("/analysis", self.analysis),
+                        web.post("/report", self.report)])
+        app.on_startup.append(self._startup)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    async def _startup(self, app):
+        workers = self.workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker,
+                                        initargs=(self.video_path, self.signals_path))
+        # The pool only starts processes as jobs are submitted: one job per
+        # worker starts (and so warms) them all before the first request.
+        await asyncio.gather(*(self._in_pool(_warm_worker, self.video_path, self.signals_path)
+                               for _ in range(workers)))
+        self.batcher.start()
+
+    async def _cleanup(self, app):
+        await self.batcher.stop()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _in_pool(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    @staticmethod
+    async def _json_body(request):
+        """The request body, which must be a JSON object (ValueError otherwise)."""
+        try:
+            body = await request.json()
+        except ValueError:
+            raise ValueError("body must be JSON") from None
+        if not isinstance(body, dict): raise ValueError("body must be a JSON object")
+        return body
+
+    @staticmethod
+    def _bad_request(error):
+        return web.json_response({"error": f"bad request: {error}"}, status=400)
+
+    async def _admit(self, request, handler):
+        """Backpressure and deadline around one analysis/report request."""
+        if self.pending >= self.max_pending:
+            self.counts['rejected'] += 1
+            return web.json_response({"error": "service busy"}, status=503, headers={"Retry-After": "1"})
+        try:
+            body = await self._json_body(request)
+            deadline = float(body.get("deadline") or request.headers.get("X-Request-Deadline")
+                             or self.default_deadline)
+        except BAD_REQUEST as e:
+            return self._bad_request(e)
+        self.pending += 1
+        self.counts['admitted'] += 1
+        try:
+            return await asyncio.wait_for(handler(body), deadline)
+        except asyncio.TimeoutError:
+            self.counts['deadline_exceeded'] += 1
+            return web.json_response({"error": f"deadline of {deadline:g}s exceeded"}, status=504)
+        except BAD_REQUEST as e:
+            return self._bad_request(e)
+        finally:
+            self.pending -= 1
+
+    @staticmethod
+    def _answers(body):
+        answers = body["answers"]
+        if not isinstance(answers, dict): raise TypeError("'answers' must be an object of item: answer")
+        return score_answers(answers)
+
+    @classmethod
+    def _scores(cls, body):
+        """OCEAN score dict from 'scores' or raw 'answers'."""
+        if "answers" in body: return cls._answers(body)
+        return {trait: float(body["scores"][trait]) for trait in OCEAN_ORDER}
+
+    async def health(self, request):
+        return web.json_response({"status": "ok", "pending": self.pending})
+
+    async def metrics(self, request):
+        lines = [f"ocean_service_pending {self.pending}"]
+        lines += [f'ocean_service_requests_total{{outcome="{k}"}} {v}' for k, v in self.counts.items()]
+        lines += [f"ocean_service_llm_requests_total {self.batcher.calls}",
+                  f"ocean_service_llm_coalesced_total {self.batcher.coalesced}"]
+        return web.Response(text=prometheus_text() + "\n".join(lines) + "\n", content_type="text/plain")
+
+    async def score(self, request):
+        """{'answers': {item: value}} -> {'scores': {trait: score}}; {'responses': [[44 answers], ...]} -> matrix."""
+        try:
+            body = await self._json_body(request)
+            if "responses" not in body: return web.json_response({"scores": self._answers(body)})
+            import numpy as np
+            responses = np.array(body["responses"], dtype=float)
+            if responses.ndim != 2 or responses.shape[1] != NUM_ITEMS:
+                raise ValueError(f"'responses' must be rows of {NUM_ITEMS} answers")
+        except BAD_REQUEST as e:
+            return self._bad_request(e)
+        scores = await asyncio.get_running_loop().run_in_executor(None, score_matrix, responses)
+        order = [COMPILED['traits'].index(t) for t in OCEAN_ORDER]
+        return web.json_response({"traits": OCEAN_ORDER, "scores": scores[:, order].tolist()})
+
+    async def analysis(self, request):
+        async def handle(body):
+            result = await self.batcher.analyze(self._scores(body))
+            return web.json_response({"analysis": self._analysis_text(result), "cached": result['cached']},
+                                     status=200 if result['ok'] else 502)
+        return await self._admit(request, handle)
+
+    @staticmethod
+    def _analysis_text(result):
+        return result['report'] if result['ok'] else f"Error generating report: {result['error']}"
+
+    async def report(self, request):
+        """
+        Body: 'scores' (or 'answers'), optional 'name', 'profile' and
+        'snapshots' (false skips the video snapshots). Returns the HTML report
+        and the analysis text as JSON.
+        """
+        async def handle(body):
+            start = time.perf_counter()
+            scores = self._scores(body)
+            profile = body.get("profile", DEFAULT_PROFILE)
+            if profile not in REPORT_PROFILES: raise ValueError(f"unknown profile {profile!r}")
+            snapshots_job = None
+            if body.get("snapshots", True) and os.path.exists(self.video_path):
+                snapshots_job = asyncio.ensure_future(
+                    self._in_pool(build_snapshots, self.video_path, self.signals_path, profile))
+            try:
+                result = await self.batcher.analyze(scores)
+                snapshots, summary = (await snapshots_job) if snapshots_job else (None, None)
+            finally:
+                if snapshots_job and not snapshots_job.done(): snapshots_job.cancel()
+            analysis = self._analysis_text(result)
+            html = await self._in_pool(render_html, body.get("name", "Candidate Name"),
+                                       [scores[t] for t in OCEAN_ORDER], analysis, snapshots, profile, summary)
+            return web.json_response({"html": html, "analysis": analysis, "cached": result['cached'],
+                                      "seconds": time.perf_counter() - start})
+        return await self._admit(request, handle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve scoring and report generation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=32, help="Requests admitted before answering 503")
+    parser.add_argument("--batch-window", type=float, default=0.02, help="Seconds to gather LLM requests")
+    parser.add_argument("--llm", choices=["gemini", "stub"], default="gemini",
+                        help="Written analysis from Gemini or the offline stub model")
+    args = parser.parse_args()
+
+    service = ReportService(args.workers, args.max_pending, args.batch_window,
+                            llm=StubChatModel() if args.llm == "stub" else None)
+    web.run_app(service.app(), host=args.host, port=args.port)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+SIGNALS = ("valence", "arousal")
+META_FILE = "meta.json"
+
+
+class ChunkedSignal:
+    """
+    Array-like view over a signal stored as fixed-size chunk files.
+
+    Uncompressed chunks are memory-mapped, so their pages are shared through
+    the OS page cache by every session and process reading the same store.
+    zstd-compressed chunks are decompressed on demand into a small LRU.
+    Sample `i` lives in chunk `i // chunk_size`, so indexing is O(1).
+    """
+
+    def __init__(self, folder, length, chunk_size, compression=None, cached_chunks=8):
+        self.folder, self.length, self.chunk_size = folder, length, chunk_size
+        self.compression = compression
+        self.cached_chunks = cached_chunks
+        # The store is shared across sessions (st.cache_resource): guard the LRU.
+        self._chunks, self._lock = OrderedDict(), threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    def chunk(self, k):
+        with self._lock:
+            arr = self._chunks.get(k)
+            if arr is not None:
+                self._chunks.move_to_end(k)
+                return arr
+        path = os.path.join(self.folder, f"{k:06d}.npy")
+        if self.compression == "zstd":
+            import io
+            import zstandard
+            with open(path + ".zst", 'rb') as f:
+                arr = np.load(io.BytesIO(zstandard.ZstdDecompressor().decompress(f.read())))
+        else:
+            arr = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._chunks[k] = arr
+            while len(self._chunks) > self.cached_chunks:
+                self._chunks.popitem(last=False)
+        return arr
+
+    def chunks(self):
+        """Yields (start index, chunk array) over the whole signal."""
+        for k in range(-(-self.length // self.chunk_size)):
+            yield k * self.chunk_size, self.chunk(k)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if stop <= start: return np.empty(0)
+            parts = [self.chunk(k)[max(start - k * self.chunk_size, 0):stop - k * self.chunk_size]
+                     for k in range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1)]
+            return np.concatenate(parts)[::step]
+        key = int(key)
+        if key < 0: key += self.length
+        if not 0 <= key < self.length: raise IndexError(key)
+        return self.chunk(key // self.chunk_size)[key % self.chunk_size]
+
+
+class EmotionSignalStore:
+    """
+    Valence/arousal signals with an explicit sample-time index aligned to the
+    recording's video.
+
+    Open either a plain folder with `valence.npy`/`arousal.npy` (memory-mapped;
+    sample times are spread evenly over `duration`, as the app always did) or
+    a chunked store written by `write_chunked_store`. Neither loads the
+    signals into process memory.
+    """
+
+    def __init__(self, valence, arousal, timestamps=None, start=0.0, rate=None):
+        self.valence, self.arousal = valence, arousal
+        self.length = min(len(valence), len(arousal))
+        # Either an explicit (sorted) timestamp array or a uniform start + rate.
+        self.timestamps, self.start, self.rate = timestamps, start, rate
+
+    @classmethod
+    def open(cls, path, duration=None):
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            valence = np.load(os.path.join(path, "valence.npy"), mmap_mode='r')
+            arousal = np.load(os.path.join(path, "arousal.npy"), mmap_mode='r')
+            n = min(len(valence), len(arousal))
+            return cls(valence, arousal, rate=n / duration if duration else 1.0)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        signals = [ChunkedSignal(os.path.join(path, name), meta['length'], meta['chunk_size'],
+                                 meta.get('compression')) for name in SIGNALS]
+        timestamps = None
+        if meta.get('rate') is None:
+            timestamps = np.load(os.path.join(path, "timestamps.npy"), mmap_mode='r')
+        return cls(*signals, timestamps=timestamps, start=meta.get('start', 0.0), rate=meta.get('rate'))
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def sample_rate(self):
+        """Mean samples per second."""
+        if self.rate: return self.rate
+        span = float(self.timestamps[self.length - 1] - self.timestamps[0])
+        return (self.length - 1) / span if span > 0 else 1.0
+
+    def timestamp(self, idx):
+        """Video time (seconds) of sample `idx`."""
+        if self.timestamps is not None: return float(self.timestamps[idx])
+        return self.start + idx / self.rate
+
+    def sample_at(self, timestamp_sec):
+        """Index of the last sample at or before `timestamp_sec`."""
+        if self.timestamps is not None:
+            idx = int(np.searchsorted(self.timestamps, timestamp_sec, side='right')) - 1
+        else:
+            idx = int(np.floor((timestamp_sec - self.start) * self.rate + 1e-9))
+        return min(max(idx, 0), self.length - 1)
+
+    def window(self, t0, t1):
+        """(timestamps, valence, arousal) of the samples with t0 <= time < t1."""
+        lo = self.sample_at(t0)
+        if self.timestamp(lo) < t0: lo += 1
+        hi = self.sample_at(t1)
+        if self.timestamp(hi) < t1: hi += 1
+        hi = min(hi, self.length)
+        times = (np.asarray(self.timestamps[lo:hi]) if self.timestamps is not None
+                 else self.start + np.arange(lo, hi) / self.rate)
+        return times, np.asarray(self.valence[lo:hi]), np.asarray(self.arousal[lo:hi])
+
+    def overview(self, max_points=2000):
+        """
+        LTTB-downsampled (valence, arousal) trajectory for plotting. Chunked
+        stores are reduced chunk by chunk, so only one chunk is decompressed at
+        a time.
+        """
+        from EmotionPlot import lttb_downsample
+        if not isinstance(self.valence, ChunkedSignal):
+            return lttb_downsample(self.valence[:self.length], self.arousal[:self.length], max_points)
+        parts_v, parts_a = [], []
+        for (start, v), (_, a) in zip(self.valence.chunks(), self.arousal.chunks()):
+            budget = max(int(max_points * len(v) / self.length), 3)
+            dv, da = lttb_downsample(v, a, budget)
+            parts_v.append(dv)
+            parts_a.append(da)
+        return np.concatenate(parts_v), np.concatenate(parts_a)
+
+
+def write_chunked_store(dest, valence, arousal, timestamps=None, rate=None, start=0.0, chunk_size=1 << 20,
+                        compression=None, level=3):
+    """
+    Writes signals as a chunked store. Pass either per-sample `timestamps`
+    (seconds, sorted) or a uniform sample `rate` (Hz) starting at `start`.
+    """
+    n = min(len(valence), len(arousal))
+    compressor = None
+    if compression == "zstd":
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=level)
+    for name, signal in zip(SIGNALS, (valence, arousal)):
+        folder = os.path.join(dest, name)
+        os.makedirs(folder, exist_ok=True)
+        for k, lo in enumerate(range(0, n, chunk_size)):
+            chunk = np.ascontiguousarray(signal[lo:min(lo + chunk_size, n)])
+            path = os.path.join(folder, f"{k:06d}.npy")
+            if compressor:
+                import io
+                buf = io.BytesIO()
+                np.save(buf, chunk)
+                with open(path + ".zst", 'wb') as f:
+                    f.write(compressor.compress(buf.getvalue()))
+            else:
+                np.save(path, chunk)
+    meta = {'length': n, 'chunk_size': chunk_size, 'compression': compression, 'start': start, 'rate': rate}
+    if rate is None:
+        np.save(os.path.join(dest, "timestamps.npy"), np.asarray(timestamps[:n], dtype=np.float64))
+    with open(os.path.join(dest, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert valence.npy/arousal.npy into a chunked signal store.")
+    parser.add_argument("source", help="Folder with valence.npy and arousal.npy")
+    parser.add_argument("dest", help="Output folder for the chunked store")
+    parser.add_argument("--duration", type=float, help="Video duration in seconds the samples span")
+    parser.add_argument("--video", help="Read the duration from this video's seek index instead")
+    parser.add_argument("--timestamps", help=".npy of per-sample times in seconds (variable-rate signals)")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="Samples per chunk file")
+    parser.add_argument("--zstd", action="store_true", help="Compress chunks with zstd")
+    args = parser.parse_args()
+
+    source = EmotionSignalStore.open(args.source, duration=args.duration)
+    times, rate = None, None
+    if args.timestamps:
+        times = np.load(args.timestamps, mmap_mode='r')
+    elif args.video:
+        from VideoIndex import load_index
+        rate = len(source) / load_index(args.video).duration
+    elif args.duration:
+        rate = len(source) / args.duration
+    else:
+        parser.error("one of --duration, --video or --timestamps is required")
+    write_chunked_store(args.dest, source.valence, source.arousal, times, rate, chunk_size=args.chunk_size,
+                        compression="zstd" if args.zstd else None)
+    print(f"Wrote {len(source)} samples to {args.dest}.")
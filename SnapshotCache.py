@@ -0,0 +1,82 @@
+import os
+from DiskCache import DiskCache, make_key
+from Instrumentation import stage
+from ReportGeneration import DEFAULT_PROFILE, REPORT_PROFILES, encode_image
+from VideoIndex import load_index
+from VideoProcessing import fit_width, get_frames, thermal_batch
+
+CACHE_PATH = os.getenv("OCEAN_SNAPSHOT_CACHE", os.path.join(".cache", "snapshots.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("OCEAN_SNAPSHOT_CACHE_MB", "512")) * 1024 * 1024
+# Frames colormapped per thermal_batch call (bounds the extra memory).
+THERMAL_BATCH = 32
+
+_cache = None
+
+
+def get_snapshot_cache():
+    """Process-wide handle on the shared snapshot cache file."""
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(CACHE_PATH, CACHE_MAX_BYTES)
+    return _cache
+
+
+def snapshot_key(digest, pts_ms, mode, size, fmt):
+    """Cache key of one encoded snapshot image."""
+    return make_key("snapshot", digest, round(float(pts_ms), 3), mode, size, fmt)
+
+
+def encode_snapshot_frames(video_path, timestamps, profile=DEFAULT_PROFILE, cache=None):
+    """
+    Returns the encoded RGB and thermal images for each timestamp.
+
+    Images are looked up in the snapshot cache by (video hash, frame time,
+    mode, output size, format); only the misses are decoded from the video
+    and encoded, and are then stored for the next report. Frames are
+    downscaled to the profile's width before the thermal view is derived.
+
+    Args:
+        video_path (str): Path to the video file.
+        timestamps (list): Timestamps in seconds.
+        profile (str): Report size profile (see REPORT_PROFILES).
+        cache (DiskCache): Cache to use; the shared snapshot cache by default.
+
+    Returns:
+        list: One {'rgb': bytes, 'thermal': bytes} dict per timestamp (b''
+        where the frame could not be read).
+    """
+    settings = REPORT_PROFILES[profile]
+    fmt = (settings['format'], settings['quality'])
+    results = [{'rgb': b"", 'thermal': b""} for _ in timestamps]
+    index = load_index(video_path)
+    if index is None or not len(index): return results
+    cache = cache or get_snapshot_cache()
+
+    missing = []
+    with stage("snapshot_cache") as rec:
+        for i, ts in enumerate(timestamps):
+            pts = index.pts_ms[index.frame_at(ts)]
+            keys = {mode: snapshot_key(index.digest, pts, mode, settings['max_width'], fmt)
+                    for mode in ('rgb', 'thermal')}
+            for mode, key in keys.items():
+                data = cache.get(key)
+                if data is None:
+                    missing.append((i, keys))
+                    break
+                results[i][mode] = data
+        rec['cache_hits'], rec['cache_misses'] = len(timestamps) - len(missing), len(missing)
+
+    # Frames stay in OpenCV's BGR order from decoding to encoding.
+    frames = get_frames(video_path, [timestamps[i] for i, _ in missing], index=index, order="bgr")
+    with stage("snapshot_encode") as rec:
+        for lo in range(0, len(missing), THERMAL_BATCH):
+            batch = [None if f is None else fit_width(f, settings['max_width'])
+                     for f in frames[lo:lo + THERMAL_BATCH]]
+            for (i, keys), frame, thermal in zip(missing[lo:lo + THERMAL_BATCH], batch, thermal_batch(batch)):
+                if frame is None: continue
+                for mode, img in (('rgb', frame), ('thermal', thermal)):
+                    data = encode_image(img, settings['format'], settings['quality'], order="bgr")
+                    cache.set(keys[mode], data)
+                    results[i][mode] = data
+                    rec['bytes'] += len(data)
+    return results
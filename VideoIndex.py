@@ -0,0 +1,146 @@
+import argparse
+import glob
+import hashlib
+import os
+import cv2
+import numpy as np
+
+INDEX_DIR = ".video_index"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+# Used only when the backend cannot report keyframes: assume one every 2 s.
+FALLBACK_GOP_SEC = 2.0
+
+_hash_memo = {}
+
+
+class VideoIndex:
+    """Presentation times and keyframe positions of every frame in a video."""
+
+    def __init__(self, pts_ms, key_frames, digest=""):
+        self.pts_ms = np.asarray(pts_ms, dtype=np.float64)
+        self.key_frames = np.asarray(key_frames, dtype=np.int64)
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.pts_ms)
+
+    @property
+    def duration(self):
+        """Length of the video in seconds, including the last frame."""
+        if len(self.pts_ms) < 2: return 0.0
+        return (self.pts_ms[-1] + (self.pts_ms[-1] - self.pts_ms[-2])) / 1000
+
+    def frame_at(self, timestamp_sec):
+        """Display index of the frame on screen at `timestamp_sec`."""
+        n = np.searchsorted(self.pts_ms, timestamp_sec * 1000 + 1e-6, side='right') - 1
+        return int(min(max(n, 0), len(self.pts_ms) - 1))
+
+    def frame_at_ms(self, pts_ms):
+        return self.frame_at(pts_ms / 1000)
+
+    def keyframe_before(self, frame_no):
+        """Display index of the last keyframe at or before `frame_no`."""
+        k = np.searchsorted(self.key_frames, frame_no, side='right') - 1
+        return int(self.key_frames[k]) if k >= 0 else 0
+
+
+def file_hash(path):
+    """Content hash of a file, memoized on its path, size and mtime."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _hash_memo:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _hash_memo[memo_key] = h.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def index_path(video_path, digest):
+    folder, name = os.path.split(os.path.abspath(video_path))
+    return os.path.join(folder, INDEX_DIR, f"{name}.{digest}.npz")
+
+
+def build_index(video_path, digest=None):
+    """
+    Scans a video once and records per-frame presentation times and keyframes.
+
+    The scan reads raw packets (no decoding), so it costs roughly one pass of
+    file I/O. Packets arrive in decode order; sorting their timestamps gives
+    the display order that a decoding VideoCapture reports.
+    """
+    digest = digest or file_hash(video_path)
+    pts, keys = [], []
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    raw = cap.isOpened()
+    if not raw:
+        cap = cv2.VideoCapture(video_path)
+    while cap.grab():
+        pts.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        if raw and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            keys.append(pts[-1])
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.release()
+
+    pts_ms = np.sort(np.asarray(pts, dtype=np.float64))
+    if keys:
+        key_frames = np.unique(np.searchsorted(pts_ms, keys))
+    else:
+        key_frames = np.arange(0, len(pts_ms), max(int(fps * FALLBACK_GOP_SEC), 1))
+    return VideoIndex(pts_ms, key_frames, digest)
+
+
+def save_index(video_path, index):
+    path = index_path(video_path, index.digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Indexes of earlier versions of this file are stale now.
+    for stale in glob.glob(index_path(video_path, "*")):
+        if stale != path: os.remove(stale)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, pts_ms=index.pts_ms, key_frames=index.key_frames)
+    os.replace(tmp, path)
+
+
+def load_index(video_path, build=True):
+    """
+    Returns the VideoIndex of a video, building and saving it if the sidecar is
+    missing or was built for different file contents.
+    """
+    if not os.path.exists(video_path): return None
+    digest = file_hash(video_path)
+    path = index_path(video_path, digest)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return VideoIndex(data['pts_ms'], data['key_frames'], digest)
+    if not build: return None
+    index = build_index(video_path, digest)
+    try:
+        save_index(video_path, index)
+    except OSError:
+        pass  # Read-only media: the index still serves this process.
+    return index
+
+
+def build_directory(folder, recursive=False, force=False):
+    """Prebuilds indexes for every video in `folder`."""
+    pattern = os.path.join(folder, "**", "*") if recursive else os.path.join(folder, "*")
+    built = 0
+    for path in sorted(glob.glob(pattern, recursive=recursive)):
+        if not path.lower().endswith(VIDEO_EXTENSIONS): continue
+        if force or load_index(path, build=False) is None:
+            save_index(path, build_index(path))
+            built += 1
+            print(f"Indexed {path}")
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild seek indexes for a directory of videos.")
+    parser.add_argument("folder", help="Directory containing the videos")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("-f", "--force", action="store_true", help="Rebuild indexes that are up to date")
+    args = parser.parse_args()
+    count = build_directory(args.folder, args.recursive, args.force)
+    print(f"{count} index(es) built.")
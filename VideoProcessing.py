@@ -0,0 +1,141 @@
+import os
+import cv2
+import numpy as np
+from Instrumentation import instrument, nbytes
+from VideoIndex import load_index
+
+# The JET colormap as 256-entry lookup tables in both channel orders, so the
+# thermal view comes out directly in the order its consumer needs.
+JET_LUT = {"bgr": cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_JET)}
+JET_LUT["rgb"] = np.ascontiguousarray(JET_LUT["bgr"][..., ::-1])
+_TO_GRAY = {"bgr": cv2.COLOR_BGR2GRAY, "rgb": cv2.COLOR_RGB2GRAY}
+
+
+def fit_width(img_array, max_width):
+    """Downscales a frame to at most `max_width` pixels wide."""
+    h, w = img_array.shape[:2]
+    if not max_width or w <= max_width: return img_array
+    return cv2.resize(img_array, (max_width, round(h * max_width / w)), interpolation=cv2.INTER_AREA)
+
+
+def to_thermal(frame, order="rgb"):
+    """Builds the pseudo-thermal view from an already decoded frame (same channel order out)."""
+    if frame is None: return None
+    return thermal_batch([frame], order=order)[0]
+
+
+@instrument("thermal_batch", size=lambda views: sum(nbytes(v) for v in views))
+def thermal_batch(frames, max_width=None, order="bgr"):
+    """
+    Pseudo-thermal views of many frames in one pass.
+
+    Frames are downscaled to `max_width` first (if given), converted to gray
+    into one stacked (N, H, W) array and mapped through the precomputed JET
+    table by a single colormap call over the whole stack. Output keeps the
+    input channel `order` ('bgr' as OpenCV decodes and encodes, or 'rgb'),
+    so no conversions are needed before encoding.
+
+    Args:
+        frames: (N, H, W, 3) array or list of frames (None entries allowed).
+
+    Returns:
+        list: One (H, W, 3) view per frame (None where the frame was None).
+    """
+    frames = [None if f is None else fit_width(f, max_width) for f in frames]
+    views = [None] * len(frames)
+    groups = {}
+    for i, frame in enumerate(frames):
+        if frame is not None: groups.setdefault(frame.shape[:2], []).append(i)
+    for (h, w), members in groups.items():
+        gray = np.empty((len(members), h, w), dtype=np.uint8)
+        for k, i in enumerate(members):
+            cv2.cvtColor(frames[i], _TO_GRAY[order], dst=gray[k])
+        thermal = cv2.applyColorMap(gray.reshape(-1, w), JET_LUT[order]).reshape(len(members), h, w, 3)
+        for k, i in enumerate(members):
+            views[i] = thermal[k]
+    return views
+
+
+@instrument("get_frame", size=nbytes)
+def get_frame(video_path, timestamp_sec, is_thermal=False):
+    frame = get_frames(video_path, [timestamp_sec])[0]
+    return to_thermal(frame) if is_thermal else frame
+
+
+@instrument("get_frames", size=lambda frames: sum(nbytes(f) for f in frames))
+def get_frames(video_path, timestamps, index=None, order="rgb"):
+    """
+    Extracts the frames at the given timestamps from a single capture.
+
+    Timestamps are resolved to frames through the video's seek index (real
+    presentation times, so variable-frame-rate files land on the right frame).
+    The video is walked forward once: when the next target lies in a later
+    GOP the capture seeks to that GOP's keyframe, otherwise the frames in
+    between are skipped with grab() (no pixel conversion). Either way at most
+    about one GOP is decoded per snapshot.
+
+    Args:
+        video_path (str): Path to the video file.
+        timestamps (list): Timestamps in seconds, in any order.
+        index (VideoIndex): Prebuilt seek index; loaded or built if omitted.
+        order (str): 'rgb', or 'bgr' to keep OpenCV's native channel order
+            when the frames go straight back to OpenCV (e.g. for encoding).
+
+    Returns:
+        list: Frames (or None where a frame could not be read), in the
+        same order as `timestamps`.
+    """
+    frames = [None] * len(timestamps)
+    if not timestamps or not os.path.exists(video_path): return frames
+    index = index or load_index(video_path)
+    if not len(index): return frames
+
+    cap = cv2.VideoCapture(video_path)
+    visit = sorted(range(len(timestamps)), key=lambda i: timestamps[i])
+
+    cur, last = -1, None
+    for i in visit:
+        target = index.frame_at(timestamps[i])
+        # Several snapshots can land on the same frame; reuse the decoded one.
+        if last is not None and target == cur:
+            frames[i] = frames[last]
+            continue
+        # Seek only when the target is in a later GOP; within the current
+        # GOP grabbing forward is cheaper than restarting from its keyframe.
+        if index.keyframe_before(target) > cur:
+            cur = _seek(cap, index, target)
+        ok = cur >= 0
+        while ok and cur < target:
+            ok = cap.grab()
+            cur += 1
+        ok, frame = cap.retrieve() if ok else (False, None)
+        if not ok:
+            # Only this snapshot is lost (e.g. an index entry past the last
+            # decodable frame); the decoder position is unknown, so re-seek.
+            cur = -1
+            continue
+        frames[i] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if order == "rgb" else frame
+        last = i
+
+    cap.release()
+    return frames
+
+
+def _seek(cap, index, target):
+    """
+    Seeks so that the next grab lands on (or just before) frame `target` and
+    grabs it, returning the display index of the grabbed frame (-1 on failure).
+
+    OpenCV addresses seeks in nominal frames (pts * FPS) and decodes forward
+    from the preceding keyframe itself, so the index's real presentation time
+    is converted to that unit. The landing position is read back from the
+    decoder, and the seek is repeated further back if it overshot.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    aim = target
+    while True:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(index.pts_ms[aim] * fps / 1000 + 0.5))
+        if not cap.grab(): return -1
+        cur = index.frame_at_ms(cap.get(cv2.CAP_PROP_POS_MSEC))
+        if cur <= target or aim == 0: return cur
+        aim = max(aim - (cur - target) - 1, 0)
@@ -1,76 +1,195 @@
+import argparse
 import json
-import random
-
-
-def generate_ocean_dataset(num_rows=50):
-    dataset = []
-
-    # Templates for professional analysis
-    traits_desc = {
-        "Openness": ["creative and intellectually curious", "prefers routine and literal thinking",
-                     "balanced between innovation and tradition"],
-        "Conscientiousness": ["highly organized and reliable", "spontaneous and potentially disorganized",
-                              "dependable in most tasks"],
-        "Extraversion": ["outgoing and energetic", "reserved and quiet", "socially adaptable"],
-        "Agreeableness": ["trusting and cooperative", "competitive and skeptical", "selective in social harmony"],
-        "Neuroticism": ["emotionally sensitive", "exceptionally resilient and calm", "stable with occasional stress"]
-    }
-
-    for i in range(num_rows):
-        # Generate random scores based on item counts in PDF
-        scores = {
-            "Extraversion": random.randint(8, 40),
-            "Agreeableness": random.randint(9, 45),
-            "Conscientiousness": random.randint(9, 45),
-            "Neuroticism": random.randint(8, 40),
-            "Openness": random.randint(10, 50)
-        }
-
-        # Build Analysis Logic
-        analysis = []
-        recommendations = []
-
-        if scores["Openness"] > 40:
-            analysis.append(
-                "You possess a high degree of intellectual curiosity and value aesthetic experiences[cite: 38, 59].")
-            recommendations.append(
-                "Seek roles that require 'out-of-the-box' thinking or artistic innovation[cite: 13, 33].")
-        elif scores["Openness"] < 20:
-            analysis.append("You prefer practical, routine-based work over abstract theory[cite: 43, 49].")
-            recommendations.append(
-                "Focus on specialized technical fields where consistency is valued over constant change.")
-
-        if scores["Conscientiousness"] > 40:
-            analysis.append(
-                "Your profile indicates you are a reliable worker who finishes tasks despite obstacles[cite: 21, 36].")
-            recommendations.append(
-                "You are well-suited for project management or roles requiring high precision[cite: 11, 41].")
-
-        if scores["Neuroticism"] < 15:
-            analysis.append("You handle stress exceptionally well and remain calm in tense situations[cite: 17, 42].")
-            recommendations.append("Consider high-pressure environments like emergency response or crisis management.")
-
-        if scores["Extraversion"] > 35:
-            analysis.append(
-                "You are someone who generates a lot of enthusiasm and enjoys leading groups[cite: 24, 34].")
-            recommendations.append("Leverage your sociability in leadership or client-facing positions[cite: 44].")
-
-        full_output = " ".join(analysis) + " Recommendations: " + " ".join(recommendations)
-
-        # Format for Fine-Tuning
-        entry = {
-            "instruction": "Generate a professional personality report based on the provided OCEAN scores.",
-            "input": f"Scores - {scores}",
-            "output": full_output
-        }
-        dataset.append(entry)
-
-    return dataset
-
-
-# Save to JSON
-ocean_data = generate_ocean_dataset(150)
-with open('ocean_finetuning_data.json', 'w') as f:
-    json.dump(ocean_data, f, indent=2)
-
-print("Dataset of 150 rows generated successfully.")
\ No newline at end of file
+import os
+import numpy as np
+
+# Trait order of the generated scores and their inclusive ranges (item counts in the PDF).
+TRAITS = ["Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness"]
+SCORE_LOW = np.array([8, 9, 9, 8, 10])
+SCORE_HIGH = np.array([40, 45, 45, 40, 50])
+
+# Templates for professional analysis
+RULES = {
+    "openness_high": (
+        "You possess a high degree of intellectual curiosity and value aesthetic experiences[cite: 38, 59].",
+        "Seek roles that require 'out-of-the-box' thinking or artistic innovation[cite: 13, 33]."),
+    "openness_low": (
+        "You prefer practical, routine-based work over abstract theory[cite: 43, 49].",
+        "Focus on specialized technical fields where consistency is valued over constant change."),
+    "conscientiousness_high": (
+        "Your profile indicates you are a reliable worker who finishes tasks despite obstacles[cite: 21, 36].",
+        "You are well-suited for project management or roles requiring high precision[cite: 11, 41]."),
+    "neuroticism_low": (
+        "You handle stress exceptionally well and remain calm in tense situations[cite: 17, 42].",
+        "Consider high-pressure environments like emergency response or crisis management."),
+    "extraversion_high": (
+        "You are someone who generates a lot of enthusiasm and enjoys leading groups[cite: 24, 34].",
+        "Leverage your sociability in leadership or client-facing positions[cite: 44]."),
+}
+
+# Record layouts: the fine-tuning format this script always wrote, and the one of Datasets/Ocean.json.
+SCHEMAS = {
+    "finetune": {
+        "instruction": "Generate a professional personality report based on the provided OCEAN scores.",
+        "input": "Scores - {" + ", ".join(f"'{t}': %d" for t in TRAITS) + "}",
+        "analysis_prefix": "",
+    },
+    "ocean": {
+        "instruction": "Generate a professional personality report and recommendations based on the provided "
+                       "OCEAN scores.",
+        "input": ", ".join(f"{t}: %d" for t in TRAITS),
+        "analysis_prefix": "Analysis: ",
+    },
+}
+NUM_CODES = 24
+
+
+def draw_scores(rng, num_rows):
+    """(num_rows, 5) integer scores in TRAITS order."""
+    return rng.integers(SCORE_LOW, SCORE_HIGH + 1, size=(num_rows, len(TRAITS)))
+
+
+def rule_codes(scores):
+    """
+    Which analysis rules fire, per row, as one code in [0, 24):
+    openness state (0 neither, 1 > 40, 2 < 20) * 8 + conscientiousness > 40 * 4
+    + neuroticism < 15 * 2 + extraversion > 35.
+    """
+    e, c, n, o = scores[:, 0], scores[:, 2], scores[:, 3], scores[:, 4]
+    openness = np.where(o > 40, 1, np.where(o < 20, 2, 0))
+    return openness * 8 + (c > 40) * 4 + (n < 15) * 2 + (e > 35)
+
+
+def rule_outputs(schema="finetune"):
+    """The 24 possible 'output' texts, indexed by `rule_codes`."""
+    prefix = SCHEMAS[schema]["analysis_prefix"]
+    outputs = []
+    for code in range(NUM_CODES):
+        names = [(None, "openness_high", "openness_low")[code // 8]]
+        names += [name for bit, name in ((4, "conscientiousness_high"), (2, "neuroticism_low"),
+                                         (1, "extraversion_high")) if code & bit]
+        fired = [RULES[name] for name in names if name]
+        analysis = " ".join(a for a, _ in fired)
+        recommendations = " ".join(r for _, r in fired)
+        outputs.append(prefix + analysis + " Recommendations: " + recommendations)
+    return outputs
+
+
+def _line_pieces(schema):
+    """
+    Lookup tables that assemble JSONL lines without per-row formatting.
+
+    A line is instruction + input (five scores) + output, and the output
+    only depends on the rule code. Each row is therefore four table entries
+    indexed by E, (A, C), (N, O) and the rule code, gathered with NumPy and
+    joined into one string per chunk.
+    """
+    spec = SCHEMAS[schema]
+    literals = json.dumps(spec["input"])[1:-1].split("%d")
+    head = '{"instruction": ' + json.dumps(spec["instruction"]) + ', "input": "' + literals[0]
+    values = [str(v) for v in range(SCORE_HIGH.max() + 1)]
+    as_table = lambda items: np.array(items, dtype=object)
+    return (as_table([head + v + literals[1] for v in values]),
+            as_table([a + literals[2] + b + literals[3] for a in values for b in values]),
+            as_table([a + literals[4] + b + literals[5] for a in values for b in values]),
+            as_table(['", "output": ' + json.dumps(out) + "}\n" for out in rule_outputs(schema)]))
+
+
+def _format_lines(pieces, scores, codes):
+    width = SCORE_HIGH.max() + 1
+    parts = np.empty((len(scores), 4), dtype=object)
+    parts[:, 0] = pieces[0][scores[:, 0]]
+    parts[:, 1] = pieces[1][scores[:, 1] * width + scores[:, 2]]
+    parts[:, 2] = pieces[2][scores[:, 3] * width + scores[:, 4]]
+    parts[:, 3] = pieces[3][codes]
+    return "".join(parts.ravel().tolist())
+
+
+def _draw_chunks(rng, num_rows, chunk_size):
+    for lo in range(0, num_rows, chunk_size):
+        scores = draw_scores(rng, min(chunk_size, num_rows - lo))
+        yield scores, rule_codes(scores)
+
+
+def iter_score_chunks(num_rows, seed=None, chunk_size=100_000):
+    """
+    Yields (scores, rule codes) chunks. The same `seed` gives the same rows
+    whatever the chunk size, so output is reproducible across runs.
+    """
+    return _draw_chunks(np.random.default_rng(seed), num_rows, chunk_size)
+
+
+def iter_records(num_rows, seed=None, schema="finetune", chunk_size=100_000):
+    """Yields dataset records as dicts."""
+    spec, outputs = SCHEMAS[schema], rule_outputs(schema)
+    for scores, codes in iter_score_chunks(num_rows, seed, chunk_size):
+        for row, code in zip(scores.tolist(), codes.tolist()):
+            yield {"instruction": spec["instruction"], "input": spec["input"] % tuple(row), "output": outputs[code]}
+
+
+def iter_jsonl(num_rows, seed=None, schema="finetune", chunk_size=100_000):
+    """Yields JSONL text, one block of `chunk_size` lines at a time."""
+    pieces = _line_pieces(schema)
+    for scores, codes in iter_score_chunks(num_rows, seed, chunk_size):
+        yield _format_lines(pieces, scores, codes)
+
+
+def _open_output(path, compress):
+    if compress == "zstd":
+        import io
+        import zstandard
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(raw), encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def shard_path(path, shard):
+    """`data.jsonl` -> `data-00003.jsonl` (and `data.jsonl.zst` -> `data-00003.jsonl.zst`)."""
+    suffix = ".zst" if path.endswith(".zst") else ""
+    root, ext = os.path.splitext(path[:len(path) - len(suffix)])
+    return f"{root}-{shard:05d}{ext}{suffix}"
+
+
+def write_dataset(path, num_rows, seed=None, schema="finetune", shard_rows=None, compress=None,
+                  chunk_size=100_000):
+    """
+    Streams the dataset to JSONL, in constant memory.
+
+    Args:
+        path (str): Output file (`.zst` is appended when compressing).
+        shard_rows (int): Start a new numbered file every `shard_rows` rows.
+        compress (str): None or 'zstd'.
+
+    Returns:
+        list: Paths written.
+    """
+    if compress == "zstd" and not path.endswith(".zst"): path += ".zst"
+    rng, pieces, paths = np.random.default_rng(seed), _line_pieces(schema), []
+    step = shard_rows or max(num_rows, 1)
+    for shard, lo in enumerate(range(0, max(num_rows, 1), step)):
+        out = shard_path(path, shard) if shard_rows else path
+        with _open_output(out, compress) as f:
+            for scores, codes in _draw_chunks(rng, min(step, num_rows - lo), chunk_size):
+                f.write(_format_lines(pieces, scores, codes))
+        paths.append(out)
+    return paths
+
+
+def generate_ocean_dataset(num_rows=50, seed=None):
+    return list(iter_records(num_rows, seed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic OCEAN fine-tuning dataset as JSONL.")
+    parser.add_argument("output", nargs="?", default="ocean_finetuning_data.jsonl", help="Output JSONL path")
+    parser.add_argument("-n", "--rows", type=int, default=150, help="Number of rows")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same dataset)")
+    parser.add_argument("--schema", choices=sorted(SCHEMAS), default="finetune",
+                        help="Record layout: the fine-tuning format or that of Datasets/Ocean.json")
+    parser.add_argument("--shard-rows", type=int, help="Split into numbered files of this many rows")
+    parser.add_argument("--zstd", action="store_true", help="Compress output with zstd")
+    args = parser.parse_args()
+
+    paths = write_dataset(args.output, args.rows, args.seed, args.schema, args.shard_rows,
+                          "zstd" if args.zstd else None)
+    print(f"Dataset of {args.rows} rows generated successfully ({len(paths)} file(s)).")
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import EmotionAnalytics
+from EmotionAnalytics import QUADRANTS, salient_indices, summarize_emotions
+from SignalStore import EmotionSignalStore, write_chunked_store
+
+
+def planted_signals(n=2_000_000, changes=10, seed=7):
+    """Noisy valence/arousal with step changes at known, well separated samples."""
+    rng = np.random.default_rng(seed)
+    slots = np.sort(rng.choice(np.arange(1, changes + 2), changes, replace=False))
+    points = slots * n // (changes + 2) + rng.integers(-n // 100, n // 100, changes)
+    level = np.zeros(n)
+    for p in points:
+        level[p:] += rng.choice([-1, 1]) * rng.uniform(0.3, 0.6)
+    valence = level + rng.normal(0, 0.2, n)
+    arousal = -0.5 * level + np.cumsum(rng.normal(0, 0.001, n)) + rng.normal(0, 0.2, n)
+    return valence.astype(np.float32), arousal.astype(np.float32), points
+
+
+def test_salient_indices_finds_planted_changes():
+    valence, arousal, points = planted_signals()
+    chosen = np.array(salient_indices(valence, arousal, count=len(points)))
+    assert len(chosen) == len(points)
+    assert all(np.abs(chosen - p).min() <= 50 for p in points)
+
+
+def test_summary_matches_direct_computation():
+    valence, arousal, _ = planted_signals(n=200_000, seed=3)
+    summary = summarize_emotions(valence, arousal, sample_rate=100)
+    v, a = valence.astype(np.float64), arousal.astype(np.float64)
+    assert np.isclose(summary['valence_mean'], v.mean()) and np.isclose(summary['arousal_std'], a.std())
+    quadrant = np.where(a < 0, np.where(v < 0, 2, 3), np.where(v < 0, 1, 0))
+    assert summary['dwell_seconds'] == {q: np.count_nonzero(quadrant == i) / 100 for i, q in enumerate(QUADRANTS)}
+    assert summary['transitions'] == np.count_nonzero(quadrant[1:] != quadrant[:-1])
+    assert summary['change_points'] >= 1
+
+
+@pytest.mark.parametrize("compression", [None, "zstd"])
+def test_chunked_store_matches_arrays(tmp_path, monkeypatch, compression):
+    if compression: pytest.importorskip("zstandard")
+    # Small analysis chunks, so they straddle the store's chunk files and each other.
+    monkeypatch.setattr(EmotionAnalytics, "CHUNK", 30_000)
+    valence, arousal, _ = planted_signals(n=500_000, seed=5)
+    write_chunked_store(str(tmp_path), valence, arousal, rate=100, chunk_size=70_000, compression=compression)
+    store = EmotionSignalStore.open(str(tmp_path))
+    assert summarize_emotions(store.valence, store.arousal, 100) == summarize_emotions(valence, arousal, 100)
+    assert salient_indices(store.valence, store.arousal) == salient_indices(valence, arousal)
@@ -0,0 +1,83 @@
+import asyncio
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+import OceanModel
+from OceanModel import ReportCache, StubChatModel, llm_analysis_batch, llm_analysis_stream
+
+
+def profile(openness):
+    return {"Openness": openness, "Conscientiousness": 50.0, "Extraversion": 50.0, "Agreeableness": 50.0,
+            "Neuroticism": 50.0}
+
+
+class EchoStub(StubChatModel):
+    """Replies with the prompt's Openness line; lower Openness answers later."""
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        line = next(l.strip() for l in messages[0].content.splitlines() if "Openness" in l)
+        await asyncio.sleep((100 - float(line.split(":")[1])) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=line))])
+
+
+class FatalStub(StubChatModel):
+    def _maybe_fail(self):
+        raise ValueError("bad request")
+
+
+class BrokenStreamStub(StubChatModel):
+    """Streams a few words, then drops the connection."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, chunk in enumerate(super()._stream(messages, stop, run_manager, **kwargs)):
+            if i == 3: raise ConnectionError("stream dropped")
+            yield chunk
+
+
+def run_batch(profiles, **kwargs):
+    kwargs.setdefault("use_cache", False)
+    return asyncio.run(llm_analysis_batch(profiles, backoff=0, **kwargs))
+
+
+def test_batch_results_in_input_order():
+    openness = [10.0, 90.0, 40.0, 70.0, 20.0]
+    results = run_batch([profile(o) for o in openness], llm=EchoStub())
+    assert [r['report'] for r in results] == [f"- Openness: {o}" for o in openness]
+    assert all(r['ok'] and r['attempts'] == 1 for r in results)
+
+
+def test_batch_retries_transient_failures_only():
+    transient = run_batch([profile(50.0)], llm=StubChatModel(failure_rate=1.0), retries=2)[0]
+    assert not transient['ok'] and transient['attempts'] == 3 and "ConnectionError" in transient['error']
+    fatal = run_batch([profile(50.0)], llm=FatalStub(), retries=2)[0]
+    assert not fatal['ok'] and fatal['attempts'] == 1 and "ValueError" in fatal['error']
+
+
+def test_batch_timeout_counts_as_failure():
+    result = run_batch([profile(50.0)], llm=StubChatModel(latency=0.5), timeout=0.05, retries=0)[0]
+    assert not result['ok'] and result['report'] is None and "TimeoutError" in result['error']
+
+
+def test_batch_second_call_hits_cache(tmp_path, monkeypatch):
+    cache = ReportCache(path=str(tmp_path / "reports.sqlite"))
+    monkeypatch.setattr(OceanModel, "get_report_cache", lambda: cache)
+    first = run_batch([profile(50.0)], llm=StubChatModel(), use_cache=True)[0]
+    # The model now always fails, so only the cache can answer.
+    second = run_batch([profile(50.0)], llm=StubChatModel(failure_rate=1.0), use_cache=True)[0]
+    assert first['ok'] and not first['cached']
+    assert second['ok'] and second['cached'] and second['report'] == first['report']
+
+
+def test_stream_yields_the_reply_in_chunks():
+    chunks = list(llm_analysis_stream(profile(50.0), use_cache=False, llm=StubChatModel()))
+    assert "".join(chunks) == StubChatModel().response
+    assert len(chunks) > 1
+
+
+def test_stream_failure_yields_error_and_caches_nothing(tmp_path, monkeypatch):
+    cache = ReportCache(path=str(tmp_path / "reports.sqlite"))
+    monkeypatch.setattr(OceanModel, "get_report_cache", lambda: cache)
+    llm = BrokenStreamStub()
+    text = "".join(llm_analysis_stream(profile(50.0), llm=llm))
+    assert text.startswith(" ".join(llm.response.split(" ")[:3]))
+    assert "Error generating report: stream dropped" in text
+    assert cache.get(cache.key(profile(50.0), llm._llm_type)) is None